@@ -1,155 +1,1675 @@
 import os
 import re
+import bisect
+import functools
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import marshal
+import math
+import mmap
+import multiprocessing
+import queue
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+import click
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 import requests
-from flask import Flask, request, jsonify
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from flask import Flask, Request, Response, g, has_request_context, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
+import pypdf
 from pypdf import PdfReader
 from flask_cors import CORS  
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
 app = Flask(__name__)
 load_dotenv()
 
 CORS(app)  
 
-syllabus_data = None
-CO_TO_UNIT_MAP = {}
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+METRIC_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
 
-def extract_text_from_pdf(file):
+metrics_registry = []
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.values = {}
+        self._lock = threading.Lock()
+        metrics_registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Prometheus-style histogram; each label set keeps per-bucket counts, a sum and a count."""
+
+    def __init__(self, name, documentation, label_names=(), buckets=METRIC_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+        metrics_registry.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{format_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+stage_seconds = Histogram("qbank_stage_duration_seconds", "Time spent in each processing stage.", ("stage",))
+pdf_page_seconds = Histogram("qbank_pdf_page_extract_seconds", "Text extraction time per PDF page.")
+pdf_pages_total = Counter("qbank_pdf_pages_total", "PDF pages by where their text came from.", ("source",))
+upstream_seconds = Histogram("qbank_upstream_duration_seconds", "Model API latency by phase.", ("phase",))
+upstream_requests = Counter("qbank_upstream_requests_total", "Model API calls by outcome.", ("outcome",))
+upstream_tokens = Counter("qbank_upstream_tokens_total", "Tokens reported by the model API.", ("kind",))
+backend_requests = Counter(
+    "qbank_backend_requests_total", "Model API calls per backend by outcome.", ("backend", "outcome")
+)
+hedged_requests = Counter("qbank_hedged_requests_total", "Hedged model calls fired and won.", ("outcome",))
+bank_questions = Counter(
+    "qbank_question_bank_questions_total", "Question bank records by what happened to them.", ("outcome",)
+)
+http_seconds = Histogram(
+    "qbank_http_request_duration_seconds",
+    "Time to build each response, excluding streamed bodies.",
+    ("endpoint", "method", "status")
+)
+
+
+def record_server_timing(name, seconds):
+    if has_request_context():
+        timings = g.get("server_timing")
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+
+def record_stage(stage, seconds):
+    stage_seconds.observe(seconds, stage)
+    record_server_timing(stage, seconds)
+
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def timed_stage(fn):
+    """Record every call of ``fn`` under its own name as a stage."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with timed(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if SERVER_TIMING or request.headers.get("X-Server-Timing") == "1":
+        g.server_timing = {}
+
+
+@app.after_request
+def finish_request_timer(response):
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    http_seconds.observe(elapsed, endpoint, request.method, str(response.status_code))
+    
+    timings = g.get("server_timing")
+    if timings is not None:
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+        entries.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(entries)
+    return response
+
+SYLLABUS_STORE_MAX = int(os.getenv("SYLLABUS_STORE_MAX", "256"))
+SYLLABUS_BACKEND = os.getenv("SYLLABUS_BACKEND", "sqlite")
+SYLLABUS_STATE_PATH = os.getenv(
+    "SYLLABUS_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "state.sqlite3")
+)
+SYLLABUS_STATE_MAX = int(os.getenv("SYLLABUS_STATE_MAX", "10000"))
+
+
+class SyllabusStore:
+    """Bounded LRU of parsed syllabi keyed by the hash of the uploaded PDF.
+
+    Sits in front of a state backend shared by every worker process: misses
+    are loaded from the backend and every insert is written through, so an
+    upload handled by one worker is visible to the others. Reads are
+    lock-free; only inserts and evictions take the lock.
+    """
+
+    def __init__(self, max_entries, backend):
+        self.max_entries = max(1, max_entries)
+        self.backend = backend
+        self._entries = {}
+        self._clock = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def latest_id(self):
+        return self.backend.latest_id()
+
+    def set_latest(self, syllabus_id):
+        self.backend.set_latest(syllabus_id)
+
+    def get(self, syllabus_id):
+        entry = self._entries.get(syllabus_id)
+        if entry is not None:
+            entry["last_used"] = next(self._clock)
+            return entry
+
+        stored = self.backend.get(syllabus_id)
+        if stored is None:
+            return None
+        syllabus_data, model = stored
+        return self._insert(syllabus_id, syllabus_data, model)
+
+    def put(self, syllabus_id, syllabus_data, model):
+        entry = self._insert(syllabus_id, syllabus_data, model)
+        self.backend.put(syllabus_id, syllabus_data.to_cache(), model)
+        return entry
+
+    def _insert(self, syllabus_id, syllabus_data, model):
+        entry = {
+            "syllabus_id": syllabus_id,
+            "syllabus_data": syllabus_data,
+            "model": model,
+            "payloads": {},
+            "last_used": next(self._clock)
+        }
+        with self._lock:
+            entries = dict(self._entries)
+            entries[syllabus_id] = entry
+            while len(entries) > self.max_entries:
+                oldest = min(entries, key=lambda key: entries[key]["last_used"])
+                del entries[oldest]
+            self._entries = entries
+        return entry
+
+    def __contains__(self, syllabus_id):
+        return syllabus_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def compute_pdf_digest(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def syllabus_id_for(digest):
+    return digest[:16]
+
+
+def resolve_syllabus(syllabus_id=None):
+    """Look up a syllabus by ID, falling back to the most recent upload."""
+    if not syllabus_id:
+        syllabus_id = syllabus_store.latest_id
+        if not syllabus_id:
+            return None
+    return syllabus_store.get(syllabus_id)
+
+
+def syllabus_not_found(syllabus_id):
+    if syllabus_id:
+        return jsonify({"error": f"Syllabus '{syllabus_id}' not found. Please upload the PDF again."}), 404
+    return jsonify({"error": "No syllabus loaded. Please upload a PDF first."}), 400
+
+# Bump whenever a parse_* function changes its output so stale cache rows are ignored.
+PARSER_VERSION = "6"
+PARSE_UNIT_MEMO_SIZE = int(os.getenv("PARSE_UNIT_MEMO_SIZE", "4096"))
+EXTRACTOR_VERSION = pypdf.__version__
+PARSE_CACHE_PATH = os.getenv(
+    "PARSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "parse_cache.sqlite3")
+)
+
+
+class SQLiteCache:
+    """Base for the SQLite-backed caches: one connection per thread, schema on first use."""
+
+    schema = None
+    mmap_size = 0
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(self.schema)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            if self.mmap_size:
+                conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+        return conn
+
+
+class ParseCache(SQLiteCache):
+    """On-disk cache of parsed syllabi keyed by PDF SHA-256 and parser version."""
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS parse_cache ("
+        " digest TEXT NOT NULL,"
+        " parser_version TEXT NOT NULL,"
+        " data BLOB NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " PRIMARY KEY (digest, parser_version))"
+    )
+
+    def get(self, digest):
+        if not self.path:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT data FROM parse_cache WHERE digest = ? AND parser_version = ?",
+                (digest, PARSER_VERSION)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(row[0]))
+        except (zlib.error, ValueError):
+            # A corrupt row is a miss; the next upload parses afresh and overwrites it.
+            return None
+
+    def put(self, digest, syllabus_data):
+        if not self.path:
+            return
+        blob = zlib.compress(json.dumps(syllabus_data, separators=(",", ":")).encode("utf-8"))
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache (digest, parser_version, data, created_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (digest, PARSER_VERSION, blob, time.time())
+                )
+        except sqlite3.Error:
+            pass
+
+
+parse_cache = ParseCache(PARSE_CACHE_PATH)
+
+
+class PageTextCache(SQLiteCache):
+    """Extracted page text keyed by a fingerprint of the page's content, shared by every syllabus.
+
+    A revised PDF usually changes a few pages; the rest hit this cache and
+    are not extracted again.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS page_text ("
+        " page_hash TEXT NOT NULL,"
+        " extractor_version TEXT NOT NULL,"
+        " text BLOB NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " PRIMARY KEY (page_hash, extractor_version))"
+    )
+
+    def get_many(self, page_hashes):
+        if not self.path or not page_hashes:
+            return {}
+        texts = {}
+        unique = list(dict.fromkeys(page_hashes))
+        try:
+            conn = self._connect()
+            # Stay well under SQLite's limit on bound parameters.
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = conn.execute(
+                    "SELECT page_hash, text FROM page_text WHERE extractor_version = ?"
+                    f" AND page_hash IN ({','.join('?' * len(batch))})",
+                    (EXTRACTOR_VERSION, *batch)
+                ).fetchall()
+                for page_hash, blob in rows:
+                    try:
+                        texts[page_hash] = zlib.decompress(blob).decode("utf-8")
+                    except (zlib.error, ValueError):
+                        # A corrupt row is a miss; the page is extracted again.
+                        continue
+        except sqlite3.Error:
+            return {}
+        return texts
+
+    def put_many(self, texts):
+        if not self.path or not texts:
+            return
+        now = time.time()
+        rows = [
+            (page_hash, EXTRACTOR_VERSION, zlib.compress(text.encode("utf-8")), now)
+            for page_hash, text in texts.items()
+        ]
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO page_text (page_hash, extractor_version, text, created_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error:
+            pass
+
+
+page_text_cache = PageTextCache(PARSE_CACHE_PATH)
+
+
+class MemorySyllabusBackend:
+    """Process-local state: nothing is shared, so only suitable for a single worker."""
+
+    def __init__(self):
+        self._latest_id = None
+
+    def get(self, syllabus_id):
+        return None
+
+    def put(self, syllabus_id, cached, model):
+        pass
+
+    def latest_id(self):
+        return self._latest_id
+
+    def set_latest(self, syllabus_id):
+        self._latest_id = syllabus_id
+
+
+class SQLiteSyllabusBackend(SQLiteCache):
+    """Parsed syllabi shared by every worker process on the host through one SQLite file.
+
+    Rows hold ``SyllabusData.to_cache()`` as compressed JSON next to the
+    binary ``Syllabus`` model, so a worker loading a syllabus another one
+    parsed skips rebuilding its CO indexes. Reads go through SQLite's
+    memory-mapped I/O. Only the newest ``max_entries`` are kept.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS syllabi ("
+        " syllabus_id TEXT PRIMARY KEY,"
+        " data BLOB NOT NULL,"
+        " model BLOB,"
+        " updated_at REAL NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS state ("
+        " name TEXT PRIMARY KEY,"
+        " value TEXT NOT NULL)"
+    )
+    mmap_size = 256 * 1024 * 1024
+
+    def __init__(self, path, max_entries):
+        super().__init__(path)
+        self.max_entries = max_entries
+
+    def get(self, syllabus_id):
+        """Return ``(cached, model)`` or None."""
+        try:
+            row = self._connect().execute(
+                "SELECT data, model FROM syllabi WHERE syllabus_id = ?", (syllabus_id,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        try:
+            syllabus_data = SyllabusData.from_cache(json.loads(zlib.decompress(row[0])))
+        except (zlib.error, ValueError, KeyError, TypeError):
+            return None
+        model = None
+        if row[1] is not None:
+            try:
+                model = Syllabus.from_bytes(row[1])
+            except (ValueError, EOFError, TypeError):
+                model = None
+        return syllabus_data, model or Syllabus.from_data(syllabus_data)
+
+    def put(self, syllabus_id, cached, model):
+        blob = zlib.compress(json.dumps(cached, separators=(",", ":")).encode("utf-8"))
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO syllabi (syllabus_id, data, model, updated_at) VALUES (?, ?, ?, ?)",
+                    (syllabus_id, blob, model.to_bytes(), time.time())
+                )
+                conn.execute(
+                    "DELETE FROM syllabi WHERE syllabus_id NOT IN"
+                    " (SELECT syllabus_id FROM syllabi ORDER BY updated_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error:
+            pass
+
+    def latest_id(self):
+        try:
+            row = self._connect().execute("SELECT value FROM state WHERE name = 'latest_id'").fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def set_latest(self, syllabus_id):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (name, value) VALUES ('latest_id', ?)", (syllabus_id,)
+                )
+        except sqlite3.Error:
+            pass
+
+
+def create_syllabus_backend():
+    if SYLLABUS_BACKEND == "memory" or not SYLLABUS_STATE_PATH:
+        return MemorySyllabusBackend()
+    if SYLLABUS_BACKEND == "sqlite":
+        return SQLiteSyllabusBackend(SYLLABUS_STATE_PATH, SYLLABUS_STATE_MAX)
+    raise ValueError(f"Unknown SYLLABUS_BACKEND '{SYLLABUS_BACKEND}'; use 'sqlite' or 'memory'.")
+
+
+syllabus_store = SyllabusStore(SYLLABUS_STORE_MAX, create_syllabus_backend())
+
+
+class GenerationCache(SQLiteCache):
+    """LRU + TTL cache of generated answers, backed by an optional SQLite tier.
+    
+    Each store also drops expired rows from the SQLite tier and keeps only its
+    newest ``max_disk_entries``.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS generation_cache ("
+        " key TEXT PRIMARY KEY,"
+        " answer TEXT NOT NULL,"
+        " expires_at REAL NOT NULL);"
+        "CREATE INDEX IF NOT EXISTS generation_cache_expires ON generation_cache (expires_at)"
+    )
+
+    def __init__(self, path, max_entries, ttl, max_disk_entries):
+        super().__init__(path)
+        self.max_entries = max(1, max_entries)
+        self.max_disk_entries = max(1, max_disk_entries)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def _remember(self, key, answer, expires_at):
+        self._entries[key] = (expires_at, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+        
+        row = None
+        if self.path:
+            try:
+                row = self._connect().execute(
+                    "SELECT answer, expires_at FROM generation_cache WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+        
+        with self._lock:
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._remember(key, row[0], row[1])
+        return row[0]
+
+    def put(self, key, answer):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, answer, expires_at)
+            self.counters["stores"] += 1
+        if not self.path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO generation_cache (key, answer, expires_at) VALUES (?, ?, ?)",
+                    (key, answer, expires_at)
+                )
+                # Every row gets the same TTL, so the earliest expiry is also the oldest store.
+                conn.execute(
+                    "DELETE FROM generation_cache WHERE expires_at <= ? OR expires_at <"
+                    " (SELECT expires_at FROM generation_cache ORDER BY expires_at DESC LIMIT 1 OFFSET ?)",
+                    (now, self.max_disk_entries - 1)
+                )
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+MINHASH_SHINGLE = 5
+MINHASH_KEYS = tuple(f"qbank-minhash-{i}".encode("ascii") for i in range(MINHASH_PERMUTATIONS // 16))
+QUESTION_LINE_PATTERN = re.compile(r"^[*_#>\s]*(?:Q\s*)?(\d+)\s*[.):]\s*(.+)$", re.IGNORECASE)
+MARK_GROUP_PATTERN = re.compile(r"(\d+)\s*-?\s*marks?\b", re.IGNORECASE)
+# "5 x 2 = 10 Marks": five questions of two marks; "(13 marks each)".
+MARKS_PRODUCT_PATTERN = re.compile(r"(\d+)\s*[x\u00d7*]\s*(\d+)\s*=\s*\d+\s*-?\s*marks?\b", re.IGNORECASE)
+MARKS_EACH_PATTERN = re.compile(r"(\d+)\s*-?\s*marks?\s+each\b", re.IGNORECASE)
+BLOOM_TAG_PATTERN = re.compile(r"\s*(?:\[([^\[\]]+)\]|\(([^()]+)\))\W*$")
+BLOOM_TAG_TERM_PATTERN = re.compile(r"\bk[1-6]\b|[a-z]+", re.IGNORECASE)
+
+
+def normalize_bloom_tag(tag):
+    """Map a tag like ``Remember``, ``Bloom's Level: Apply`` or ``K4`` to a Bloom level name."""
+    for term in BLOOM_TAG_TERM_PATTERN.findall(tag):
+        term = term.lower()
+        if term.upper() in BLOOM_LEVELS:
+            return BLOOM_LEVELS[term.upper()]
+        if term == "analyse":
+            term = "analyze"
+        for level in BLOOM_LEVELS.values():
+            if term == level.lower():
+                return level
+    return None
+
+
+def heading_marks(line):
+    """Per-question marks named by a heading line, or None if it names none."""
+    for pattern, group in ((MARKS_PRODUCT_PATTERN, 2), (MARKS_EACH_PATTERN, 1), (MARK_GROUP_PATTERN, 1)):
+        match = pattern.search(line)
+        if match:
+            return int(match.group(group))
+    return None
+
+
+def split_bloom_tag(text):
+    """Return ``(text, bloom_level, tagged)`` with a trailing ``[Level]`` or ``(Level)`` tag removed."""
+    tag_match = BLOOM_TAG_PATTERN.search(text)
+    if not tag_match:
+        return text, None, False
+    bloom_level = normalize_bloom_tag(tag_match.group(1) or tag_match.group(2))
+    # A trailing parenthesis is only a tag if it names a level.
+    if tag_match.group(1) or bloom_level:
+        return text[:tag_match.start()].rstrip(), bloom_level, True
+    return text, None, False
+
+
+class QuestionStreamParser:
+    """Single-pass parser turning model output into question records as it arrives.
+
+    ``feed`` accepts chunks split anywhere and returns the questions they
+    completed; ``close`` flushes the rest. Numbered lines start a question
+    and unnumbered lines continue it; any other line mentioning ``N marks``
+    (``2-MARK QUESTIONS:``, ``Part A (2 marks each)``, ``PART B - (2 x 13
+    = 26 Marks)``) sets the per-question marks of the questions after it. A question is complete at the end of a line
+    carrying its Bloom tag, or otherwise when the next question, heading
+    or blank line starts. Records are ``{"number", "marks", "text",
+    "bloom_level", "course_outcome"}``; ``marks`` is None before any
+    heading.
+    """
+
+    def __init__(self, course_outcome=None):
+        self.course_outcome = course_outcome
+        self.marks = None
+        self.current = None
+        self.pending = ""
+        self.questions = []
+
+    def feed(self, chunk):
+        self.pending += chunk
+        completed = []
+        start = 0
+        newline = self.pending.find("\n")
+        while newline != -1:
+            completed.extend(self._line(self.pending[start:newline]))
+            start = newline + 1
+            newline = self.pending.find("\n", start)
+        self.pending = self.pending[start:]
+        return completed
+
+    def close(self):
+        completed = self._line(self.pending) if self.pending else []
+        self.pending = ""
+        return completed + self._finish()
+
+    def _line(self, line):
+        stripped = line.strip()
+        if not stripped:
+            return self._finish()
+        
+        question_match = QUESTION_LINE_PATTERN.match(stripped)
+        marks = None if question_match else heading_marks(stripped)
+        if question_match:
+            completed = self._finish()
+            self.current = {"number": int(question_match.group(1)), "marks": self.marks, "text": question_match.group(2)}
+        elif marks is not None:
+            completed = self._finish()
+            self.marks = marks
+            return completed
+        elif self.current is not None:
+            completed = []
+            self.current["text"] += " " + stripped
+        else:
+            return []
+        
+        if split_bloom_tag(self.current["text"].replace("**", "").strip())[2]:
+            completed.extend(self._finish())
+        return completed
+
+    def _finish(self):
+        current, self.current = self.current, None
+        if current is None:
+            return []
+        text, bloom_level, _ = split_bloom_tag(current["text"].replace("**", "").strip())
+        if len(text) < 8:
+            return []
+        record = {
+            "number": current["number"],
+            "marks": current["marks"],
+            "text": text,
+            "bloom_level": bloom_level,
+            "course_outcome": self.course_outcome
+        }
+        self.questions.append(record)
+        return [record]
+
+
+def parse_generated_questions(answer, course_outcome=None):
+    """Parse a complete model answer; see ``QuestionStreamParser``."""
+    parser = QuestionStreamParser(course_outcome)
+    parser.feed(answer)
+    parser.close()
+    return parser.questions
+
+
+BLOOM_LEVEL_WORDS = r"(?P<level>remember|understand|apply|analy[sz]e|evaluate|create)"
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
+}
+BLOOM_COUNT_PATTERNS = (
+    # "2 Apply questions", "two apply-level questions", "3 questions at the Analyze level"
+    re.compile(
+        r"\b(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")\s+(?:questions?\s+(?:at|on|of|in)\s+(?:the\s+)?)?"
+        + BLOOM_LEVEL_WORDS + r"\b",
+        re.IGNORECASE
+    ),
+    # "Apply: 2", "Remember x 3"
+    re.compile(r"\b" + BLOOM_LEVEL_WORDS + r"(?:\s+level)?\s*[:=x]\s*(?P<count>\d+)\b", re.IGNORECASE),
+)
+# Only "Apply level" / "Apply-level", so "questions that apply to ..." is not a request.
+BLOOM_MENTION_PATTERN = re.compile(r"\b" + BLOOM_LEVEL_WORDS + r"[\s-]+level\b", re.IGNORECASE)
+
+
+def requested_bloom_levels(prompt):
+    """Read the Bloom levels a prompt asks for: ``({level: count}, {levels named without a count})``."""
+    counts = {}
+    for pattern in BLOOM_COUNT_PATTERNS:
+        for match in pattern.finditer(prompt):
+            level = normalize_bloom_tag(match.group("level"))
+            count = match.group("count").lower()
+            counts[level] = counts.get(level, 0) + (int(count) if count.isdigit() else NUMBER_WORDS[count])
+    mentioned = {normalize_bloom_tag(match.group("level")) for match in BLOOM_MENTION_PATTERN.finditer(prompt)}
+    return counts, mentioned - set(counts)
+
+
+def check_bloom_distribution(records, requested=None, mentioned=()):
+    """Compare the Bloom tags of parsed questions with what was asked for, without calling the model.
+
+    ``requested`` maps levels to minimum counts and ``mentioned`` lists
+    levels that should appear at least once. When neither is given the
+    default instructions apply: questions must be tagged and, from three
+    questions up, use more than one level.
+    """
+    requested = requested or {}
+    actual = {}
+    untagged = 0
+    for record in records:
+        if record["bloom_level"]:
+            actual[record["bloom_level"]] = actual.get(record["bloom_level"], 0) + 1
+        else:
+            untagged += 1
+    
+    issues = []
+    if not records:
+        issues.append("no questions were found in the answer")
+    if untagged:
+        issues.append(f"{untagged} question(s) have no Bloom's level tag")
+    for level, count in requested.items():
+        if actual.get(level, 0) < count:
+            issues.append(f"asked for {count} {level} question(s), got {actual.get(level, 0)}")
+    for level in sorted(set(mentioned) - set(requested)):
+        if level not in actual:
+            issues.append(f"asked for {level} questions, got none")
+    if not requested and not mentioned and len(records) >= 3 and len(actual) < 2:
+        issues.append("every question uses the same Bloom's level")
+    
+    return {
+        "requested": dict(requested, **{level: None for level in mentioned if level not in requested}) or None,
+        "actual": actual,
+        "untagged": untagged,
+        "ok": not issues,
+        "issues": issues
+    }
+
+
+def minhash_signature(text):
+    normalized = " ".join(TOPIC_TERM_PATTERN.findall(text.lower()))
+    if len(normalized) <= MINHASH_SHINGLE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + MINHASH_SHINGLE] for i in range(len(normalized) - MINHASH_SHINGLE + 1)}
+    # Each keyed 64-byte BLAKE2b digest yields 16 independent 32-bit hash
+    # functions, so a shingle costs a few digests rather than 64 hashes.
+    rows = []
+    for shingle in shingles:
+        data = shingle.encode("utf-8")
+        digests = b"".join(hashlib.blake2b(data, digest_size=64, key=key).digest() for key in MINHASH_KEYS)
+        rows.append(memoryview(digests).cast("I").tolist())
+    return tuple(map(min, zip(*rows)))
+
+
+def minhash_bands(signature):
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    return [
+        (band, hash(signature[band * rows:(band + 1) * rows]))
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def minhash_similarity(left, right):
+    return sum(a == b for a, b in zip(left, right)) / MINHASH_PERMUTATIONS
+
+
+class QuestionBank(SQLiteCache):
+    """Generated questions kept as individual records, per syllabus, CO, marks and Bloom level.
+
+    Each record carries a MinHash signature; its bands are indexed (LSH) so
+    a new question is compared only against bank questions sharing a band,
+    and stored only if none of them is a near-duplicate. Records handed
+    out by ``take`` are counted so later requests rotate through the bank.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS questions ("
+        " id INTEGER PRIMARY KEY,"
+        " syllabus_id TEXT NOT NULL,"
+        " co_code TEXT NOT NULL,"
+        " marks INTEGER NOT NULL,"
+        " bloom_level TEXT,"
+        " text TEXT NOT NULL,"
+        " signature BLOB NOT NULL,"
+        " served INTEGER NOT NULL DEFAULT 0,"
+        " created_at REAL NOT NULL);"
+        "CREATE INDEX IF NOT EXISTS questions_lookup"
+        " ON questions (syllabus_id, co_code, marks, bloom_level);"
+        "CREATE TABLE IF NOT EXISTS question_bands ("
+        " syllabus_id TEXT NOT NULL,"
+        " band INTEGER NOT NULL,"
+        " bucket INTEGER NOT NULL,"
+        " question_id INTEGER NOT NULL);"
+        "CREATE INDEX IF NOT EXISTS question_bands_lookup"
+        " ON question_bands (syllabus_id, band, bucket)"
+    )
+
+    def __init__(self, path, threshold):
+        super().__init__(path)
+        self.threshold = threshold
+
+    def find_duplicate(self, conn, syllabus_id, signature):
+        bands = minhash_bands(signature)
+        clause = " OR ".join("(band = ? AND bucket = ?)" for _ in bands)
+        params = [syllabus_id] + [value for pair in bands for value in pair]
+        candidates = conn.execute(
+            "SELECT DISTINCT question_id FROM question_bands WHERE syllabus_id = ? AND (" + clause + ")",
+            params
+        ).fetchall()
+        for (question_id,) in candidates:
+            row = conn.execute("SELECT signature FROM questions WHERE id = ?", (question_id,)).fetchone()
+            if row and minhash_similarity(signature, marshal.loads(row[0])) >= self.threshold:
+                return question_id
+        return None
+
+    def add(self, syllabus_id, co_code, records):
+        """Store the records that are not near-duplicates; returns how many were stored."""
+        if not self.path or not records:
+            return 0
+        stored = 0
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for record in records:
+                    if record["marks"] is None:
+                        continue
+                    signature = minhash_signature(record["text"])
+                    if self.find_duplicate(conn, syllabus_id, signature) is not None:
+                        bank_questions.inc("duplicate")
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO questions (syllabus_id, co_code, marks, bloom_level, text, signature, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (syllabus_id, co_code, record["marks"], record["bloom_level"], record["text"],
+                         marshal.dumps(signature), time.time())
+                    )
+                    conn.executemany(
+                        "INSERT INTO question_bands (syllabus_id, band, bucket, question_id) VALUES (?, ?, ?, ?)",
+                        [(syllabus_id, band, bucket, cursor.lastrowid) for band, bucket in minhash_bands(signature)]
+                    )
+                    stored += 1
+        except sqlite3.Error:
+            return 0
+        bank_questions.inc("stored", amount=stored)
+        return stored
+
+    def take(self, syllabus_id, co_code, marks, count, bloom_level=None, exclude=()):
+        """Hand out up to ``count`` matching questions, least-served first."""
+        if not self.path or count <= 0:
+            return []
+        query = "SELECT id, marks, bloom_level, text FROM questions WHERE syllabus_id = ? AND co_code = ? AND marks = ?"
+        params = [syllabus_id, co_code, marks]
+        if bloom_level:
+            query += " AND bloom_level = ?"
+            params.append(bloom_level)
+        if exclude:
+            query += f" AND id NOT IN ({','.join('?' * len(exclude))})"
+            params.extend(exclude)
+        query += " ORDER BY served, id LIMIT ?"
+        params.append(count)
+        try:
+            conn = self._connect()
+            with conn:
+                rows = conn.execute(query, params).fetchall()
+                conn.executemany("UPDATE questions SET served = served + 1 WHERE id = ?", [(row[0],) for row in rows])
+        except sqlite3.Error:
+            return []
+        bank_questions.inc("served", amount=len(rows))
+        return [{"id": row[0], "marks": row[1], "bloom_level": row[2], "text": row[3]} for row in rows]
+
+    def count(self, syllabus_id, co_code, marks):
+        if not self.path:
+            return 0
+        try:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM questions WHERE syllabus_id = ? AND co_code = ? AND marks = ?",
+                (syllabus_id, co_code, marks)
+            ).fetchone()
+        except sqlite3.Error:
+            return 0
+        return row[0]
+
+    def list(self, syllabus_id, co_code=None, marks=None, bloom_level=None, limit=100):
+        if not self.path:
+            return []
+        query = "SELECT id, co_code, marks, bloom_level, text, served FROM questions WHERE syllabus_id = ?"
+        params = [syllabus_id]
+        for column, value in (("co_code", co_code), ("marks", marks), ("bloom_level", bloom_level)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value)
+        query += " ORDER BY co_code, marks, id LIMIT ?"
+        params.append(limit)
+        try:
+            rows = self._connect().execute(query, params).fetchall()
+        except sqlite3.Error:
+            return []
+        return [
+            {"id": row[0], "course_outcome": row[1], "marks": row[2], "bloom_level": row[3], "text": row[4], "served": row[5]}
+            for row in rows
+        ]
+
+    def stats(self):
+        if not self.path:
+            return {"questions": 0}
+        try:
+            row = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(served), 0) FROM questions").fetchone()
+        except sqlite3.Error:
+            return {"questions": 0}
+        return {"questions": row[0], "served": row[1]}
+
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_MAX_PAGES = int(os.getenv("UPLOAD_MAX_PAGES", "300"))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+# Werkzeug stops reading a request body past this while parsing the form,
+# whether or not the client sent a Content-Length. Routes that take larger
+# bodies raise it for their own request.
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES + UPLOAD_CHUNK_BYTES
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadRequest(Request):
+    """Spools large multipart file parts to a named temp file that ``SpooledUpload`` can map in place."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_BYTES:
+            return io.BytesIO()
+        return tempfile.NamedTemporaryFile(suffix=".upload")
+
+
+app.request_class = UploadRequest
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": f"Request is larger than {request.max_content_length} bytes"}), 413
+
+
+class SpooledUpload:
+    """An upload copied in chunks into memory, moving to a named temp file past ``UPLOAD_SPOOL_BYTES``.
+
+    The SHA-256 digest is computed while copying, and the copy stops with
+    ``UploadRejected`` as soon as it passes ``max_bytes``, so an oversized
+    upload is never held whole. A stream ``UploadRequest`` already spooled
+    to disk is hashed and mapped where it is instead of being copied again.
+    Use as a context manager to remove the file.
+    """
+
+    def __init__(self, stream, max_bytes):
+        self.path = None
+        self.size = 0
+        self.head = b""
+        self._file = io.BytesIO()
+        self._maps = []
+        spooled = getattr(stream, "name", None)
+        if isinstance(spooled, str) and os.path.isfile(spooled):
+            self._file = stream
+            self.path = spooled
+            stream.seek(0)
+        digest = hashlib.sha256()
+        try:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                self.size += len(chunk)
+                if self.size > max_bytes:
+                    raise UploadRejected(413, f"File is larger than {max_bytes} bytes")
+                if len(self.head) < 1024:
+                    self.head += chunk[:1024 - len(self.head)]
+                digest.update(chunk)
+                if self._file is not stream:
+                    self._file.write(chunk)
+                    if self.path is None and self.size > UPLOAD_SPOOL_BYTES:
+                        self._roll_over()
+            self._file.flush()
+        except BaseException:
+            self.close()
+            raise
+        self.digest = digest.hexdigest()
+
+    def _roll_over(self):
+        spooled = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        spooled.write(self._file.getbuffer())
+        self._file = spooled
+        self.path = spooled.name
+
+    def open(self):
+        """Return a readable, seekable view: an mmap of the temp file, or the in-memory buffer."""
+        if self.path is None:
+            self._file.seek(0)
+            return self._file
+        mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def close(self):
+        for mapped in self._maps:
+            mapped.close()
+        self._file.close()
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def copy_upload(stream, target, max_bytes):
+    """Copy an upload into ``target`` in chunks, raising ``UploadRejected`` once it passes ``max_bytes``."""
+    size = 0
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return size
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadRejected(413, f"File is larger than {max_bytes} bytes")
+        target.write(chunk)
+
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+BULK_MAX_FILE_BYTES = int(os.getenv("BULK_MAX_FILE_BYTES", str(50 * 1024 * 1024)))
+BULK_MAX_ARCHIVE_BYTES = int(os.getenv("BULK_MAX_ARCHIVE_BYTES", str(1024 * 1024 * 1024)))
+
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool():
+    global _extract_pool
+    
+    if _extract_pool is None:
+        with _extract_pool_lock:
+            if _extract_pool is None:
+                _extract_pool = ProcessPoolExecutor(
+                    max_workers=PDF_EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _extract_pool
+
+
+def reset_extract_pool(pool):
+    """Drop a broken pool so the next ``get_extract_pool`` call starts a fresh one."""
+    global _extract_pool
+    
+    with _extract_pool_lock:
+        if _extract_pool is pool:
+            _extract_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_page(page):
+    """Return ``(text, seconds)`` for one page."""
+    started = time.perf_counter()
+    text = page.extract_text()
+    return text, time.perf_counter() - started
+
+
+def open_pdf_reader(source):
+    """Open a PDF given as bytes or as a file path; files are memory-mapped, not read in."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return PdfReader(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return PdfReader(io.BytesIO(source))
+
+
+def extract_page_list(source, indices):
+    reader = open_pdf_reader(source)
+    return [extract_page(reader.pages[i]) for i in indices]
+
+
+def extract_pages_parallel(source, indices):
+    # Two chunks per worker keeps the pool busy when some pages are much slower than others.
+    chunk_size = max(1, -(-len(indices) // (PDF_EXTRACT_WORKERS * 2)))
+    pool = get_extract_pool()
+    try:
+        chunks = pool.map(
+            extract_page_list,
+            itertools.repeat(source),
+            [indices[start:start + chunk_size] for start in range(0, len(indices), chunk_size)]
+        )
+        return [page for chunk in chunks for page in chunk]
+    except BrokenProcessPool:
+        reset_extract_pool(pool)
+        raise
+
+
+def stream_digest(stream):
+    try:
+        return hashlib.sha256(stream.get_object().get_data()).digest()
+    except Exception:
+        return b"?"
+
+
+def page_fingerprint(page):
+    """Hash everything text extraction reads from a page: content streams, fonts, forms and rotation."""
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(hashlib.sha256(contents.get_data()).digest())
+    digest.update(str(page.get("/Rotate", 0)).encode())
+    
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else {}
+    fonts = resources.get("/Font")
+    fonts = fonts.get_object() if fonts is not None else {}
+    for name in sorted(fonts):
+        font = fonts[name].get_object()
+        digest.update(f"{name}|{font.get('/BaseFont')}|{font.get('/Subtype')}|{font.get('/Encoding')}".encode())
+        if "/ToUnicode" in font:
+            digest.update(stream_digest(font["/ToUnicode"]))
+    xobjects = resources.get("/XObject")
+    xobjects = xobjects.get_object() if xobjects is not None else {}
+    for name in sorted(xobjects):
+        xobject = xobjects[name].get_object()
+        if xobject.get("/Subtype") == "/Form":
+            digest.update(name.encode() + stream_digest(xobject))
+    return digest.hexdigest()
+
+
+def check_page_count(page_count, max_pages):
+    if max_pages and page_count > max_pages:
+        raise UploadRejected(413, f"PDF has {page_count} pages; the limit is {max_pages}")
+
+
+@timed_stage
+def extract_text_from_pdf(file, path=None, max_pages=None):
+    """Extract the text of every page, in parallel for long PDFs.
+
+    Pages whose fingerprint is already in the page text cache are not
+    extracted again, so re-uploading a revised PDF only extracts the pages
+    that changed. When the PDF is also on disk at ``path``, worker processes
+    map that file instead of being sent a copy of its bytes.
+    """
     reader = PdfReader(file)
+    page_count = len(reader.pages)
+    check_page_count(page_count, max_pages)
+    
+    page_hashes = []
+    texts = {}
+    if page_text_cache.path:
+        page_hashes = [page_fingerprint(page) for page in reader.pages]
+        cached = page_text_cache.get_many(page_hashes)
+        texts = {i: cached[page_hash] for i, page_hash in enumerate(page_hashes) if page_hash in cached}
+    pdf_pages_total.inc("cache", amount=len(texts))
+    missing = [i for i in range(page_count) if i not in texts]
+    if page_hashes:
+        # Identical pages within one PDF only need extracting once.
+        first_seen = {}
+        for i in missing:
+            first_seen.setdefault(page_hashes[i], i)
+        duplicates = [i for i in missing if first_seen[page_hashes[i]] != i]
+        missing = list(first_seen.values())
+    
+    extracted = None
+    if PDF_EXTRACT_WORKERS > 1 and len(missing) >= PDF_PARALLEL_MIN_PAGES:
+        if path is None:
+            file.seek(0)
+        try:
+            extracted = extract_pages_parallel(path or file.read(), missing)
+        except BrokenProcessPool:
+            extracted = None
+    
+    if extracted is None:
+        extracted = [extract_page(reader.pages[i]) for i in missing]
+    
+    for i, (text, seconds) in zip(missing, extracted):
+        pdf_page_seconds.observe(seconds)
+        texts[i] = text or ""
+    pdf_pages_total.inc("extracted", amount=len(missing))
+    if page_hashes and missing:
+        page_text_cache.put_many({page_hashes[i]: texts[i] for i in missing})
+        for i in duplicates:
+            texts[i] = texts[first_seen[page_hashes[i]]]
+    
     pages = []
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            pages.append(text)
+    for i in range(page_count):
+        if texts[i]:
+            pages.append(texts[i])
     return "\n".join(pages)
 
-def parse_course_metadata(text):
+# Every pattern below is either anchored on a literal or has no two adjacent
+# quantifiers that can match the same characters, so a failed match can only
+# rescan a bounded run. Anything that used to rely on lazy ``.*?`` spanning
+# lines is done by scanning for the terminator instead.
+SECTION_PATTERN = re.compile(
+    r"(?P<course_outcomes>Course Outcomes)"
+    r"|(?P<unit>(?i:\bUNIT\b[-–\s]*[IVX\d]+\b))"
+    r"|(?P<mapping>COs/POs/PSOs Mapping)"
+    r"|(?P<text_books>Text Books)"
+    r"|(?P<reference_books>Reference Books)"
+    r"|(?P<web_references>Web References)"
+    r"|(?P<lecture_periods>Lecture Periods)"
+    r"|(?P<correlation_level>Correlation Level)"
+)
+
+UNIT_TERMINATORS = ("unit", "mapping", "text_books", "reference_books", "web_references", "lecture_periods")
+REFERENCE_TERMINATORS = ("course_outcomes", "mapping", "text_books", "reference_books",
+                         "web_references", "lecture_periods", "correlation_level")
+
+COURSE_NAME_LABEL = re.compile(r"Course Name(\s+)", re.I)
+COURSE_NAME_END = re.compile(r"\s\d")
+COURSE_CODE_PATTERN = re.compile(r"Course Code\s+(\S+)")
+SEMESTER_PATTERN = re.compile(r"Semester\s+([IVX\d]+)")
+DEPARTMENT_LABEL = re.compile(r"Department(\s+)", re.I)
+DEPARTMENT_END = re.compile(r"\s(?:Programme:|Course Code:)", re.I)
+PROGRAMME_LABEL = re.compile(r"Programme([:\s]+)", re.I)
+PROGRAMME_END = re.compile(r"\s(?:Semester|Course Code:)", re.I)
+PREREQUISITE_LABEL = re.compile(r"Prerequisite(\s+)", re.I)
+PREREQUISITE_END = re.compile(r"\s(?:Course Outcomes|On completion)", re.I)
+PERIODS_LABEL = re.compile(r"Periods/Week\s+L\s+T\s+P\s+C")
+PERIODS_VALUES = re.compile(r"\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)")
+MARKS_LABEL = re.compile(r"Maximum Marks")
+MARKS_VALUES = re.compile(r"\s(\d+)\s+(\d+)\s+(\d+)")
+CO_START_PATTERN = re.compile(r"(CO\d+)\s+")
+CO_LEVEL_PATTERN = re.compile(r"\s(K\d+)")
+
+UNIT_HEADING_PATTERN = re.compile(r"UNIT[-–\s]*[IVX\d]+", re.I)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+UNIT_PERIODS_PATTERN = re.compile(r"\sPeriods\s*[:–]\s*(\d+)", re.I)
+PERIOD_SUMMARY_START = re.compile(r'Lecture Periods', re.I)
+PERIOD_SUMMARY_END = re.compile(r'Total Periods:\d+', re.I)
+HEADING_STOP_PATTERN = re.compile(r'[a-z:]')
+CO_CODE_PATTERN = re.compile(r'\b(CO\d+)\b')
+TOPIC_SPLIT_PATTERN = re.compile(r'[–—\-•\n.]+')
+
+LECTURE_PERIODS_PATTERN = re.compile(r'Lecture Periods\s*[:–]\s*(\d+)', re.I)
+TUTORIAL_PERIODS_PATTERN = re.compile(r'Tutorial Periods\s*[:–]\s*(\d+|[-–])', re.I)
+PRACTICAL_PERIODS_PATTERN = re.compile(r'Practical Periods\s*[:–]\s*(\d+|[-–])', re.I)
+TOTAL_PERIODS_PATTERN = re.compile(r'Total Periods\s*[:–]\s*(\d+)', re.I)
+
+ITEM_START_PATTERN = re.compile(r'(?<!\d)\d+\.\s+')
+ITEM_END_PATTERN = re.compile(r'(?<!\d)\d+\.')
+URL_PATTERN = re.compile(r'https?://[^\s]+')
+
+TABLE_ROW_PATTERN = re.compile(r'^\d\s+')
+
+ASSESSMENT_HEADING = re.compile(r'Assessment\s*\n')
+WORD_PATTERN = re.compile(r'\b\w+\b')
+NUMBER_PATTERN = re.compile(r'\b\d+\b')
+TOTAL_MARKS_PATTERN = re.compile(r'Total Marks\s+(\d+)')
+
+
+@timed_stage
+def index_sections(text):
+    """Find every section heading in one pass, as an ordered list of (offset, name)."""
+    return [(match.start(), match.lastgroup) for match in SECTION_PATTERN.finditer(text)]
+
 
+def find_section(sections, name, after=0):
+    for offset, heading in sections:
+        if heading == name and offset >= after:
+            return offset
+    return -1
+
+
+def find_section_end(sections, name, names, after, default):
+    """Offset of the first heading in ``names`` after ``after``; a repeat of ``name`` itself does not end the section."""
+    for offset, heading in sections:
+        if offset > after and heading in names and heading != name:
+            return offset
+    return default
+
+
+def next_section_after(sections, index, names, default):
+    for i in range(index + 1, len(sections)):
+        offset, heading = sections[i]
+        if heading in names:
+            return offset
+    return default
+
+
+def find_unit_heading(text, sections, after=0):
+    """Like ``find_section`` for units, but only upper-case ``UNIT`` headings end the header and outcomes."""
+    for offset, heading in sections:
+        if heading == "unit" and offset >= after and text.startswith("UNIT", offset):
+            return offset
+    return -1
+
+
+def find_field(text, label_pattern, end_pattern, required_end=False):
+    """Return the stripped text between a label and the first end marker after it."""
+    label = label_pattern.search(text)
+    if not label:
+        return None
+    start = label.end()
+    end = end_pattern.search(text, start)
+    if end:
+        return text[start:end.start()].strip()
+    if not required_end and start < len(text) and text[-1].isspace():
+        return text[start:].strip()
+    # The value may still be empty when the separator after the label is long
+    # enough to lend its last whitespace character to the end marker.
+    if start - label.start(1) >= 2 and text[start - 1].isspace():
+        if end_pattern.match(text, start - 1) or (not required_end and start == len(text)):
+            return ""
+    return None
+
+
+def join_lines(text):
+    return " ".join(line.strip() for line in text.split("\n") if line.strip())
+
+
+@timed_stage
+def parse_course_metadata(text, sections=None):
+
+    if sections is None:
+        sections = index_sections(text)
+    
     metadata = {}
     
-    course_name_match = re.search(r"Course Name\s+(.*?)\s+(?=\d|$)", text, re.I | re.S)
-    if course_name_match:
-        metadata["course_name"] = course_name_match.group(1).strip()
+    first_unit = find_unit_heading(text, sections)
+    header = text[:first_unit] if first_unit != -1 else text
+    # Only the real end of the text may stand in for a missing end marker.
+    truncated = first_unit != -1
+    
+    course_name = find_field(header, COURSE_NAME_LABEL, COURSE_NAME_END, required_end=truncated)
+    if course_name is not None:
+        metadata["course_name"] = course_name
     
-    course_code_match = re.search(r"Course Code\s+(\S+)", text)
+    course_code_match = COURSE_CODE_PATTERN.search(header)
     if course_code_match:
         metadata["course_code"] = course_code_match.group(1)
     
-    semester_match = re.search(r"Semester\s+([IVX\d]+)", text)
+    semester_match = SEMESTER_PATTERN.search(header)
     if semester_match:
         metadata["semester"] = semester_match.group(1)
     
-    dept_match = re.search(r"Department\s+(.*?)\s+(?=Programme:|Course Code:|$)", text, re.I | re.S)
-    if dept_match:
-        metadata["department"] = dept_match.group(1).strip()
-    
-    programme_match = re.search(r"Programme[:\s]+(.*?)\s+(?=Semester|Course Code:|$)", text, re.I | re.S)
-    if programme_match:
-        metadata["programme"] = programme_match.group(1).strip()
-    
-    periods_match = re.search(r"Periods/Week\s+L\s+T\s+P\s+C\s+.*?\n\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)", text)
-    if periods_match:
-        metadata["periods"] = {
-            "lecture": int(periods_match.group(1)),
-            "tutorial": int(periods_match.group(2)),
-            "practical": int(periods_match.group(3)),
-            "credits": int(periods_match.group(4))
-        }
+    department = find_field(header, DEPARTMENT_LABEL, DEPARTMENT_END, required_end=truncated)
+    if department is not None:
+        metadata["department"] = department
     
-    marks_match = re.search(r"Maximum Marks.*?\n.*?\n.*?\s+(\d+)\s+(\d+)\s+(\d+)", text, re.S)
-    if marks_match:
-        metadata["marks_distribution"] = {
-            "continuous_assessment": int(marks_match.group(1)),
-            "end_semester_exam": int(marks_match.group(2)),
-            "total_marks": int(marks_match.group(3))
-        }
+    programme = find_field(header, PROGRAMME_LABEL, PROGRAMME_END, required_end=truncated)
+    if programme is not None:
+        metadata["programme"] = programme
+    
+    line_end = -1
+    for label in PERIODS_LABEL.finditer(header):
+        gap_match = WHITESPACE_PATTERN.match(header, label.end())
+        if not gap_match:
+            continue
+        # The values sit on the line after the header row; the header row may
+        # itself end inside the whitespace that follows the label.
+        if line_end < gap_match.end():
+            line_end = header.find("\n", gap_match.end())
+            if line_end == -1:
+                line_end = len(header)
+        candidates = [line_end + 1] if line_end < len(header) else []
+        if "\n" in header[label.end() + 1:gap_match.end()]:
+            candidates.append(gap_match.end())
+        periods_match = None
+        for position in candidates:
+            periods_match = PERIODS_VALUES.match(header, position)
+            if periods_match:
+                break
+        if periods_match:
+            metadata["periods"] = {
+                "lecture": int(periods_match.group(1)),
+                "tutorial": int(periods_match.group(2)),
+                "practical": int(periods_match.group(3)),
+                "credits": int(periods_match.group(4))
+            }
+            break
     
-    prereq_match = re.search(r"Prerequisite\s+(.*?)\s+(?=Course Outcomes|On completion)", text, re.I | re.S)
-    if prereq_match:
-        metadata["prerequisite"] = prereq_match.group(1).strip()
+    marks_label = MARKS_LABEL.search(header)
+    if marks_label:
+        first_line_end = header.find("\n", marks_label.end())
+        second_line_end = header.find("\n", first_line_end + 1) if first_line_end != -1 else -1
+        marks_match = MARKS_VALUES.search(header, second_line_end + 1) if second_line_end != -1 else None
+        if marks_match:
+            metadata["marks_distribution"] = {
+                "continuous_assessment": int(marks_match.group(1)),
+                "end_semester_exam": int(marks_match.group(2)),
+                "total_marks": int(marks_match.group(3))
+            }
+    
+    prerequisite = find_field(header, PREREQUISITE_LABEL, PREREQUISITE_END, required_end=True)
+    if prerequisite is not None:
+        metadata["prerequisite"] = prerequisite
     
-    co_pattern = re.compile(r"(CO\d+)\s+(.*?)\s+(K\d+)", re.S)
     course_outcomes = []
     
-    co_section_start = text.find("Course Outcomes")
+    co_section_start = find_section(sections, "course_outcomes")
     if co_section_start != -1:
-        co_section = text[co_section_start:]
-        co_end = co_section.find("UNIT")
-        if co_end != -1:
-            co_section = co_section[:co_end]
+        co_end = find_unit_heading(text, sections, co_section_start)
+        co_section = text[co_section_start:co_end] if co_end != -1 else text[co_section_start:]
         
-        for match in co_pattern.finditer(co_section):
+        position = 0
+        while True:
+            co_match = CO_START_PATTERN.search(co_section, position)
+            if not co_match:
+                break
+            level_match = CO_LEVEL_PATTERN.search(co_section, co_match.end())
+            if not level_match and co_match.end() - co_match.end(1) >= 2:
+                level_match = CO_LEVEL_PATTERN.match(co_section, co_match.end() - 1)
+            if not level_match:
+                break
             course_outcomes.append({
-                "code": match.group(1),
-                "description": match.group(2).strip(),
-                "blooms_level": match.group(3)
+                "code": co_match.group(1),
+                "description": co_section[co_match.end():level_match.start()].strip(),
+                "blooms_level": level_match.group(1)
             })
+            position = level_match.end()
     
     metadata["course_outcomes"] = course_outcomes
     
     return metadata
 
-def parse_units(text):
-    unit_pattern = re.compile(
-        r"(UNIT\s*[-–\s]*[IVX\d]+)\s+(.*?)\s+Periods\s*[:–]\s*(\d+)(.*?)(?=UNIT\s*[-–\s]*[IVX\d]+|COs/POs/PSOs Mapping|Text Books|Reference Books|Web References|Lecture Periods|\Z)",
-        re.S | re.I
-    )
+def strip_period_summaries(content):
+    pieces = []
+    position = 0
+    while True:
+        start = PERIOD_SUMMARY_START.search(content, position)
+        if not start:
+            break
+        end = PERIOD_SUMMARY_END.search(content, start.end())
+        if not end:
+            break
+        pieces.append(content[position:start.start()])
+        position = end.end()
+    pieces.append(content[position:])
+    return "".join(pieces)
+
+
+def split_topic_blocks(content):
+    """Split unit content into blocks, starting a new one at each ``HEADING:`` line.
+    
+    A heading starts with an upper-case letter and may wrap onto later lines,
+    as long as its colon comes before any lower-case letter. Lines are
+    classified bottom-up so each one is scanned once.
+    """
+    lines = content.split("\n")
+    starts_heading = [False] * len(lines)
+    colon_first = False
+    for i in range(len(lines) - 1, -1, -1):
+        stop = HEADING_STOP_PATTERN.search(lines[i])
+        if stop:
+            colon_first = stop.group() == ":"
+        starts_heading[i] = "A" <= lines[i][:1] <= "Z" and colon_first
+    
+    blocks = []
+    current = []
+    for line, heading in zip(lines, starts_heading):
+        if current and heading:
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    blocks.append("\n".join(current))
+    return blocks
+
+
+@functools.lru_cache(maxsize=PARSE_UNIT_MEMO_SIZE)
+def parse_unit_block(block):
+    """Parse one ``UNIT`` block, from its heading up to the next section.
+
+    Memoised on the block text, so re-parsing a revised syllabus only does
+    the work for units whose text changed. The returned dict is shared and
+    must be treated as read-only.
+    """
+    heading_match = UNIT_HEADING_PATTERN.match(block)
+    if not heading_match:
+        return None
+    gap_match = WHITESPACE_PATTERN.match(block, heading_match.end())
+    if not gap_match:
+        return None
+    title_start = gap_match.end()
+    periods_match = UNIT_PERIODS_PATTERN.search(block, title_start)
+    if not periods_match:
+        title_start = heading_match.end() + 1
+        periods_match = UNIT_PERIODS_PATTERN.search(block, title_start)
+    if not periods_match:
+        return None
+    
+    unit_id = heading_match.group(0).strip()
+    title = block[title_start:periods_match.start()].strip()
+    periods = int(periods_match.group(1))
+    content = block[periods_match.end():].strip()
+    
+    content = strip_period_summaries(content)
+    
+    topics = {}
+    
+    for topic_block in split_topic_blocks(content):
+        topic_block = topic_block.strip()
+        if ':' in topic_block:
+            parts = topic_block.split(':', 1)
+            if len(parts) == 2:
+                heading = parts[0].strip()
+                content_text = parts[1].strip()
+                
+                content_text = CO_CODE_PATTERN.sub('', content_text).strip()
+                
+                topic_list = []
+                for topic in TOPIC_SPLIT_PATTERN.split(content_text):
+                    topic = topic.strip()
+                    if topic and len(topic) > 1:
+                        topic = topic.rstrip(',.:;')
+                        if topic:
+                            topic_list.append(topic)
+                
+                if topic_list:
+                    topics[heading] = topic_list
+    
+    co_match = CO_CODE_PATTERN.search(content)
+    co = co_match.group(1) if co_match else None
+    
+    return {
+        "unit_id": unit_id,
+        "title": title,
+        "periods": periods,
+        "topics": topics,
+        "course_outcome": co
+    }
+
+
+@timed_stage
+def parse_units(text, sections=None):
+
+    if sections is None:
+        sections = index_sections(text)
     
     units = []
     
-    for match in unit_pattern.finditer(text):
-        unit_id = match.group(1).strip()
-        title = match.group(2).strip()
-        periods = int(match.group(3))
-        content = match.group(4).strip()
-        
-        content = re.sub(r'Lecture Periods.*?Total Periods:\d+', '', content, flags=re.S | re.I)
-        
-        topics = {}
-        
-        blocks = re.split(r'\n(?=[A-Z][^a-z]*:)', content)
-        
-        for block in blocks:
-            block = block.strip()
-            if ':' in block:
-                parts = block.split(':', 1)
-                if len(parts) == 2:
-                    heading = parts[0].strip()
-                    content_text = parts[1].strip()
-                    
-                    content_text = re.sub(r'\bCO\d+\b', '', content_text).strip()
-                    
-                    topic_list = []
-                    for topic in re.split(r'[–—\-•\n.]+', content_text):
-                        topic = topic.strip()
-                        if topic and len(topic) > 1:
-                            topic = re.sub(r'[,.:;]+$', '', topic)
-                            if topic:
-                                topic_list.append(topic)
-                    
-                    if topic_list:
-                        topics[heading] = topic_list
-        
-        co_match = re.search(r'\b(CO\d+)\b', content)
-        co = co_match.group(1) if co_match else None
-        
-        units.append({
-            "unit_id": unit_id,
-            "title": title,
-            "periods": periods,
-            "topics": topics,
-            "course_outcome": co
-        })
+    for index, (unit_start, heading) in enumerate(sections):
+        if heading != "unit":
+            continue
+        unit_end = next_section_after(sections, index, UNIT_TERMINATORS, len(text))
+        unit = parse_unit_block(text[unit_start:unit_end])
+        if unit is not None:
+            units.append(unit)
     
     return units
 
-def parse_total_periods(text):
+@timed_stage
+def parse_total_periods(text, sections=None):
 
+    if sections is None:
+        sections = index_sections(text)
+    
     periods_info = {}
     
-    lecture_match = re.search(r'Lecture Periods\s*[:–]\s*(\d+)', text, re.I)
-    tutorial_match = re.search(r'Tutorial Periods\s*[:–]\s*(\d+|[-–])', text, re.I)
-    practical_match = re.search(r'Practical Periods\s*[:–]\s*(\d+|[-–])', text, re.I)
-    total_match = re.search(r'Total Periods\s*[:–]\s*(\d+)', text, re.I)
+    lecture_start = find_section(sections, "lecture_periods")
+    summary = text[lecture_start:] if lecture_start != -1 else text
+    
+    lecture_match = LECTURE_PERIODS_PATTERN.search(summary)
+    tutorial_match = TUTORIAL_PERIODS_PATTERN.search(summary)
+    practical_match = PRACTICAL_PERIODS_PATTERN.search(summary)
+    total_match = TOTAL_PERIODS_PATTERN.search(summary)
     
     if lecture_match:
         periods_info["lecture_periods"] = int(lecture_match.group(1))
@@ -171,71 +1691,84 @@ def parse_total_periods(text):
     
     return periods_info if periods_info else None
 
-def parse_references(text):
+def parse_numbered_items(section):
+    items = []
+    position = 0
+    while True:
+        start = ITEM_START_PATTERN.search(section, position)
+        if not start:
+            break
+        end = ITEM_END_PATTERN.search(section, start.end())
+        position = end.start() if end else len(section)
+        item = section[start.end():position].strip()
+        if item:
+            items.append(join_lines(item))
+    return items
+
+@timed_stage
+def parse_references(text, sections=None):
+
+    if sections is None:
+        sections = index_sections(text)
+    
     references = {
         "text_books": [],
         "reference_books": [],
         "web_references": []
     }
     
-    tb_start = text.find("Text Books")
-    rb_start = text.find("Reference Books")
-    wr_start = text.find("Web References")
+    tb_start = find_section(sections, "text_books")
+    rb_start = find_section(sections, "reference_books")
+    wr_start = find_section(sections, "web_references")
     
     if tb_start != -1:
-        tb_end = rb_start if rb_start != -1 else wr_start if wr_start != -1 else len(text)
-        tb_section = text[tb_start:tb_end]
-        
-        tb_items = re.findall(r'\d+\.\s+(.*?)(?=\d+\.|$)', tb_section, re.S)
-        for item in tb_items:
-            if item.strip():
-                item = re.sub(r'\s*\n\s*', ' ', item.strip())
-                references["text_books"].append(item)
+        tb_end = find_section_end(sections, "text_books", REFERENCE_TERMINATORS, tb_start, len(text))
+        references["text_books"].extend(parse_numbered_items(text[tb_start:tb_end]))
     
     if rb_start != -1:
-        rb_end = wr_start if wr_start != -1 else len(text)
-        rb_section = text[rb_start:rb_end]
-        
-        rb_items = re.findall(r'\d+\.\s+(.*?)(?=\d+\.|$)', rb_section, re.S)
-        for item in rb_items:
-            if item.strip():
-                item = re.sub(r'\s*\n\s*', ' ', item.strip())
-                references["reference_books"].append(item)
+        rb_end = find_section_end(sections, "reference_books", REFERENCE_TERMINATORS, rb_start, len(text))
+        references["reference_books"].extend(parse_numbered_items(text[rb_start:rb_end]))
     
     if wr_start != -1:
-        wr_section = text[wr_start:]
+        wr_end = find_section_end(sections, "web_references", REFERENCE_TERMINATORS, wr_start, len(text))
+        wr_section = text[wr_start:wr_end]
         
-        urls = re.findall(r'https?://[^\s]+', wr_section)
+        urls = URL_PATTERN.findall(wr_section)
         for url in urls:
             references["web_references"].append(url.strip())
         
-        wr_items = re.findall(r'\d+\.\s+(.*?)(?=\d+\.|$)', wr_section, re.S)
-        for item in wr_items:
-            item = item.strip()
-            if item and item not in references["web_references"] and not item.startswith("http"):
-                item = re.sub(r'\s*\n\s*', ' ', item)
+        for item in parse_numbered_items(wr_section):
+            if item not in references["web_references"] and not item.startswith("http"):
                 references["web_references"].append(item)
     
     return references
 
-def parse_co_po_pso_table(text):
+@timed_stage
+def parse_co_po_pso_table(text, sections=None):
 
-    table_start = text.find("COs/POs/PSOs Mapping")
+    if sections is None:
+        sections = index_sections(text)
+    
+    table_start = find_section(sections, "mapping")
     if table_start == -1:
         return None
     
-    table_section = text[table_start:]
-    
-    next_section = re.search(r'\n\s*\n\s*[A-Z]', table_section)
-    if next_section:
-        table_section = table_section[:next_section.start()]
+    table_end = find_section_end(sections, "mapping", REFERENCE_TERMINATORS, table_start, len(text))
+    table_section = text[table_start:table_end]
     
     rows = []
     lines = table_section.split('\n')
+    after_blank = False
     
     for line in lines:
         line = line.strip()
-        if re.match(r'^\d\s+', line):
+        if not line:
+            after_blank = True
+            continue
+        if after_blank and 'A' <= line[0] <= 'Z':
+            break
+        after_blank = False
+        if TABLE_ROW_PATTERN.match(line):
             parts = line.split()
             if len(parts) >= 1:
                 co_num = parts[0]
@@ -280,25 +1813,41 @@ def parse_co_po_pso_table(text):
         "mapping": rows
     }
 
-def parse_assessment_details(text):
+@timed_stage
+def parse_assessment_details(text, sections=None):
 
+    if sections is None:
+        sections = index_sections(text)
+    
     assessment = {}
     
-    assessment_section_start = text.find("Correlation Level")
+    assessment_section_start = find_section(sections, "correlation_level")
     if assessment_section_start == -1:
         return None
     
     assessment_section = text[assessment_section_start:]
     
-    assessment_match = re.search(
-        r'Assessment\s*\n.*?\n.*?\n(.*?)\n.*?\n(.*?)(?=\n\s*\n|\Z)',
-        assessment_section,
-        re.S
-    )
+    lines = []
+    heading_match = ASSESSMENT_HEADING.search(assessment_section)
+    if heading_match:
+        # Start after the last blank line following the heading, unless that
+        # would leave too few lines for the header and value rows.
+        first_newline = assessment_section.index('\n', heading_match.start())
+        lines = assessment_section[first_newline + 1:].split('\n')
+        skip = heading_match.group().count('\n') - 1
+        lines = lines[max(0, min(skip, len(lines) - 5)):]
     
-    if assessment_match:
-        headers = re.findall(r'\b\w+\b', assessment_match.group(1))
-        values = re.findall(r'\b\d+\b', assessment_match.group(2))
+    if len(lines) >= 5:
+        header_line = lines[2]
+        value_lines = [lines[4]]
+        for line in lines[5:]:
+            if not line.strip():
+                break
+            value_lines.append(line)
+        value_text = '\n'.join(value_lines)
+        
+        headers = WORD_PATTERN.findall(header_line)
+        values = NUMBER_PATTERN.findall(value_text)
         
         if headers and values:
             components = []
@@ -312,7 +1861,7 @@ def parse_assessment_details(text):
             if components:
                 assessment["components"] = components
                 
-                total_match = re.search(r'Total Marks\s+(\d+)', assessment_match.group(2))
+                total_match = TOTAL_MARKS_PATTERN.search(value_text)
                 if total_match:
                     assessment["total_marks"] = int(total_match.group(1))
     
@@ -320,77 +1869,1192 @@ def parse_assessment_details(text):
 
 
 
-def build_co_to_unit_map(syllabus_data):
+LAZY_SECTIONS = {
+    "assessment_details": parse_assessment_details,
+    "references": parse_references,
+    "co_po_pso_mapping": parse_co_po_pso_table
+}
+
+
+class SyllabusData(dict):
+    """A parsed syllabus whose secondary sections are parsed on first access.
+
+    Question generation only needs the metadata and units, so references,
+    the CO/PO/PSO table and assessment details are parsed from the kept text
+    the first time they are read, then memoised. The text is dropped once
+    nothing is left to parse. Iterating or serialising the dict parses
+    whatever is still pending.
+    """
+
+    def __init__(self, data, text=None, pending=(), sections=None):
+        super().__init__(data)
+        self.text = text
+        self.pending = {key for key in pending if key in LAZY_SECTIONS and key not in data}
+        self._sections = sections
+        self._lock = threading.Lock()
+
+    def resolve(self, key):
+        if key not in self.pending:
+            return
+        with self._lock:
+            if key not in self.pending:
+                return
+            if self._sections is None:
+                self._sections = index_sections(self.text)
+            dict.__setitem__(self, key, LAZY_SECTIONS[key](self.text, self._sections))
+            self.pending.discard(key)
+            if not self.pending:
+                self.text = None
+                self._sections = None
+
+    def resolve_all(self):
+        for key in list(self.pending):
+            self.resolve(key)
+        return self
+
+    def __getitem__(self, key):
+        self.resolve(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.resolve(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key in self.pending or super().__contains__(key)
+
+    def __iter__(self):
+        return super(SyllabusData, self.resolve_all()).__iter__()
+
+    def __len__(self):
+        return len(self.pending) + super().__len__()
+
+    def keys(self):
+        return super(SyllabusData, self.resolve_all()).keys()
+
+    def values(self):
+        return super(SyllabusData, self.resolve_all()).values()
+
+    def items(self):
+        return super(SyllabusData, self.resolve_all()).items()
+
+    def to_cache(self):
+        """A JSON-ready form that keeps pending sections unparsed."""
+        with self._lock:
+            return {"data": dict(dict.items(self)), "text": self.text, "pending": sorted(self.pending)}
+
+    @classmethod
+    def from_cache(cls, cached):
+        return cls(cached["data"], cached.get("text"), cached.get("pending", ()))
+
+
+@timed_stage
+def parse_syllabus(text):
+
+    sections = index_sections(text)
+    
+    course_metadata = parse_course_metadata(text, sections)
+    units = parse_units(text, sections)
+    total_periods_info = parse_total_periods(text, sections)
+    
+    return SyllabusData({
+        "course_metadata": course_metadata,
+        "syllabus_structure": {
+            "total_units": len(units),
+            "unit_periods": units[0]["periods"] if units else None,
+            "units": units,
+            "total_periods_info": total_periods_info
+        }
+    }, text, LAZY_SECTIONS, sections)
+
+
+def find_syllabus(digest):
+    """Return the stored syllabus for a PDF digest, loading it from the parse cache if needed."""
+    syllabus_id = syllabus_id_for(digest)
+    
+    syllabus = syllabus_store.get(syllabus_id)
+    if syllabus:
+        return syllabus
+    
+    cached = parse_cache.get(digest)
+    if cached is None:
+        return None
+    syllabus_data = SyllabusData.from_cache(cached)
+    return syllabus_store.put(syllabus_id, syllabus_data, Syllabus.from_data(syllabus_data))
+
+
+def register_syllabus(digest, syllabus_data):
+    parse_cache.put(digest, syllabus_data.to_cache())
+    return syllabus_store.put(syllabus_id_for(digest), syllabus_data, Syllabus.from_data(syllabus_data))
+
+
+def load_syllabus(upload):
+    """Parse a spooled syllabus PDF, reusing the in-memory store and on-disk cache."""
+    syllabus = find_syllabus(upload.digest)
+    cached = syllabus is not None
+    if not cached:
+        text = extract_text_from_pdf(upload.open(), upload.path, UPLOAD_MAX_PAGES)
+        syllabus = register_syllabus(upload.digest, parse_syllabus(text))
+    # Only single uploads move the "latest upload" pointer; bulk ingestion does not.
+    syllabus_store.set_latest(syllabus["syllabus_id"])
+    return syllabus, cached
+
+
+def parse_pdf_bytes(pdf_bytes):
+    """Extract and parse one PDF serially, in cache form; bulk ingestion runs this in the extraction pool."""
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    check_page_count(len(reader.pages), UPLOAD_MAX_PAGES)
+    pages = [text for text, _ in map(extract_page, reader.pages) if text]
+    return parse_syllabus("\n".join(pages)).to_cache()
+
+
+def iter_zip_pdfs(archive):
+    """Yield ``(name, read)`` for each PDF in a zip; ``read()`` returns the bytes or raises ValueError."""
+    with zipfile.ZipFile(archive) as zip_file:
+        for info in zip_file.infolist():
+            name = info.filename
+            if info.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+                continue
+            
+            def read(info=info):
+                if info.file_size > BULK_MAX_FILE_BYTES:
+                    raise ValueError(f"File is larger than {BULK_MAX_FILE_BYTES} bytes")
+                return zip_file.read(info)
+            
+            yield name, read
+
+
+def iter_directory_pdfs(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(".pdf"):
+                continue
+            full_path = os.path.join(root, name)
+            
+            def read(full_path=full_path):
+                if os.path.getsize(full_path) > BULK_MAX_FILE_BYTES:
+                    raise ValueError(f"File is larger than {BULK_MAX_FILE_BYTES} bytes")
+                with open(full_path, "rb") as f:
+                    return f.read()
+            
+            yield os.path.relpath(full_path, path), read
+
+
+def describe_ingested(name, syllabus, cached):
+    model = syllabus["model"]
+    return {
+        "file": name,
+        "status": "ok",
+        "syllabus_id": syllabus["syllabus_id"],
+        "cached": cached,
+        "course_code": model.course_code,
+        "course_name": model.course_name,
+        "available_cos": model.available_cos
+    }
+
+
+def ingest_pdfs(pdfs):
+    """Parse many PDFs across the extraction pool, yielding one progress dict per file as it finishes.
+
+    ``pdfs`` yields ``(name, read)`` pairs. Only a couple of files per worker
+    are read and in flight at a time, so a large archive is never held in
+    memory at once. Already-known PDFs are served from the store or cache,
+    and with a single extraction worker files are parsed in-process. The last
+    item summarises the batch.
+    """
+    started = time.perf_counter()
+    counts = {"ok": 0, "error": 0}
+    pending = {}
+    window = max(1, PDF_EXTRACT_WORKERS * 2)
+    pdfs = iter(pdfs)
+    exhausted = False
+    
+    def finish(name, digest, pdf_bytes, pool, future):
+        try:
+            try:
+                cached = future.result() if future else parse_pdf_bytes(pdf_bytes)
+            except BrokenProcessPool:
+                reset_extract_pool(pool)
+                cached = parse_pdf_bytes(pdf_bytes)
+        except Exception as e:
+            return {"file": name, "status": "error", "error": f"Error processing PDF: {str(e)}"}
+        return describe_ingested(name, register_syllabus(digest, SyllabusData.from_cache(cached)), False)
+    
+    while not exhausted or pending:
+        while not exhausted and len(pending) < window:
+            try:
+                name, read = next(pdfs)
+            except StopIteration:
+                exhausted = True
+                break
+            try:
+                pdf_bytes = read()
+                digest = compute_pdf_digest(pdf_bytes)
+                syllabus = find_syllabus(digest)
+                if syllabus:
+                    event = describe_ingested(name, syllabus, True)
+                elif PDF_EXTRACT_WORKERS <= 1:
+                    event = finish(name, digest, pdf_bytes, None, None)
+                else:
+                    pool = get_extract_pool()
+                    try:
+                        future = pool.submit(parse_pdf_bytes, pdf_bytes)
+                    except BrokenProcessPool:
+                        reset_extract_pool(pool)
+                        event = finish(name, digest, pdf_bytes, pool, None)
+                    else:
+                        pending[future] = (name, digest, pdf_bytes, pool)
+                        continue
+            except Exception as e:
+                event = {"file": name, "status": "error", "error": f"Error processing PDF: {str(e)}"}
+            counts[event["status"]] += 1
+            yield event
+        
+        if not pending:
+            continue
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            event = finish(*pending.pop(future), future)
+            counts[event["status"]] += 1
+            yield event
+    
+    yield {
+        "status": "done",
+        "total": counts["ok"] + counts["error"],
+        "succeeded": counts["ok"],
+        "failed": counts["error"],
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+BLOOM_LEVELS = {
+    "K1": "Remember",
+    "K2": "Understand",
+    "K3": "Apply",
+    "K4": "Analyze",
+    "K5": "Evaluate",
+    "K6": "Create"
+}
+SYLLABUS_MODEL_FORMAT = 2
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "768"))
+CHARS_PER_TOKEN = 4
+TOPIC_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text):
+    """Rough token count for budgeting prompts; about four characters per token."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def topic_terms(text):
+    terms = []
+    for term in TOPIC_TERM_PATTERN.findall(text.lower()):
+        if term.isdigit():
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def render_topics(topics):
+    lines = []
+    for category, subtopics in topics.items():
+        lines.append(f"{category}:\n")
+        lines.extend(f"  - {subtopic}\n" for subtopic in subtopics)
+    return "".join(lines)
+
+
+@dataclass(slots=True, frozen=True)
+class Unit:
+    unit_id: str
+    title: str
+    periods: int
+    course_outcome: str
+    topics: dict
+    context: str = field(default="", compare=False, repr=False)
+
+    def to_tuple(self):
+        return (self.unit_id, self.title, self.periods, self.course_outcome, self.topics)
+
+    @classmethod
+    def from_tuple(cls, values):
+        unit_id, title, periods, course_outcome, topics = values
+        return cls(unit_id, title, periods, course_outcome, topics, render_topics(topics))
+
+    @classmethod
+    def from_dict(cls, unit):
+        return cls.from_tuple((
+            unit.get("unit_id", ""),
+            unit.get("title", ""),
+            unit.get("periods"),
+            unit.get("course_outcome"),
+            unit.get("topics", {})
+        ))
+
+
+@dataclass(slots=True)
+class Syllabus:
+    """Compact, read-only view of a parsed syllabus for the request path.
+
+    Built once per syllabus, it carries what every question needs: the
+    CO to unit lookup and the topic index ranking a unit's subtopics
+    against a prompt. The full ``SyllabusData`` tree is still kept for the
+    detail endpoints.
+    """
+
+    course_code: str
+    course_name: str
+    units: tuple
+    co_units: dict = field(init=False, repr=False, compare=False)
+    topic_index: object = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.co_units = {}
+        for unit in self.units:
+            if unit.course_outcome and unit.context:
+                self.co_units[unit.course_outcome] = unit
+        self.topic_index = TopicIndex(self.co_units)
+
+    @property
+    def available_cos(self):
+        return list(self.co_units)
+
+    def unit_for(self, co_code):
+        return self.co_units.get(co_code)
+
+    def select_context(self, co_code, prompt, budget=None):
+        """Topic context for a CO ranked against ``prompt`` and packed into ``budget`` tokens.
+
+        See ``TopicIndex.select``; None when the CO has no unit.
+        """
+        if co_code not in self.co_units:
+            return None
+        return self.topic_index.select(
+            self.co_units[co_code], prompt, CONTEXT_TOKEN_BUDGET if budget is None else budget
+        )
+
+    @classmethod
+    def from_data(cls, syllabus_data):
+        """Build the model from a ``SyllabusData`` without forcing its lazy sections."""
+        with timed("build_syllabus_model"):
+            return cls._from_data(syllabus_data)
+
+    @classmethod
+    def _from_data(cls, syllabus_data):
+        metadata = syllabus_data.get("course_metadata", {}) if syllabus_data else {}
+        structure = syllabus_data.get("syllabus_structure", {}) if syllabus_data else {}
+        
+        return cls(
+            metadata.get("course_code"),
+            metadata.get("course_name"),
+            tuple(Unit.from_dict(unit) for unit in structure.get("units", []))
+        )
+
+    def to_tuple(self):
+        return (self.course_code, self.course_name, tuple(unit.to_tuple() for unit in self.units))
+
+    @classmethod
+    def from_tuple(cls, values):
+        course_code, course_name, units = values
+        return cls(course_code, course_name, tuple(Unit.from_tuple(row) for row in units))
+
+    def to_bytes(self):
+        return marshal.dumps((SYLLABUS_MODEL_FORMAT, self.to_tuple()))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        version, values = marshal.loads(blob)
+        if version != SYLLABUS_MODEL_FORMAT:
+            raise ValueError(f"Unsupported syllabus model format {version}")
+        return cls.from_tuple(values)
+
+
+class TopicIndex:
+    """TF-IDF vectors for every subtopic of a syllabus, built once per syllabus.
+
+    Each subtopic is a document of its own terms plus, at half weight, its
+    category heading's; IDF is taken over all subtopics of the syllabus.
+    Vectors are sparse dicts: units hold tens of subtopics, so a dot
+    product per subtopic is cheaper than building a matrix.
+    """
+
+    __slots__ = ("idf", "entries")
+
+    def __init__(self, co_units):
+        documents = {}
+        document_frequency = {}
+        for co_code, unit in co_units.items():
+            rows = []
+            for category_index, (category, subtopics) in enumerate(unit.topics.items()):
+                heading_terms = topic_terms(category)
+                for position, subtopic in enumerate(subtopics):
+                    weights = {}
+                    for term in heading_terms:
+                        weights[term] = weights.get(term, 0) + 0.5
+                    for term in topic_terms(subtopic):
+                        weights[term] = weights.get(term, 0) + 1.0
+                    for term in weights:
+                        document_frequency[term] = document_frequency.get(term, 0) + 1
+                    rows.append((category_index, position, category, subtopic, weights))
+            documents[co_code] = rows
+        
+        total = sum(len(rows) for rows in documents.values())
+        self.idf = {
+            term: math.log((1 + total) / (1 + count)) + 1
+            for term, count in document_frequency.items()
+        }
+        
+        self.entries = {}
+        for co_code, rows in documents.items():
+            entries = []
+            for category_index, position, category, subtopic, weights in rows:
+                vector = {term: weight * self.idf[term] for term, weight in weights.items()}
+                norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+                entries.append((
+                    category_index,
+                    position,
+                    category,
+                    subtopic,
+                    {term: value / norm for term, value in vector.items()}
+                ))
+            self.entries[co_code] = tuple(entries)
+
+    def score(self, co_code, prompt):
+        query = {}
+        for term in topic_terms(prompt):
+            if term in self.idf:
+                query[term] = query.get(term, 0) + self.idf[term]
+        return [
+            sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            for _, _, _, _, vector in self.entries.get(co_code, ())
+        ]
+
+    def select(self, unit, prompt, budget):
+        """Return ``{"topics", "tokens", "categories", "subtopics_used", "subtopics_total"}``.
+
+        The whole unit is used when it fits the budget (or the budget is 0).
+        Otherwise subtopics are taken by relevance to the prompt, ties going
+        round-robin across categories so a prompt that matches nothing still
+        samples every category, and rendered back in syllabus order.
+        """
+        entries = self.entries.get(unit.course_outcome, ())
+        full_tokens = estimate_tokens(unit.context)
+        if budget <= 0 or full_tokens <= budget:
+            return {
+                "topics": unit.context,
+                "tokens": full_tokens,
+                "categories": list(unit.topics),
+                "subtopics_used": len(entries),
+                "subtopics_total": len(entries)
+            }
+        
+        scores = self.score(unit.course_outcome, prompt)
+        order = sorted(range(len(entries)), key=lambda i: (-scores[i], entries[i][1], entries[i][0]))
+        
+        chosen = set()
+        headings = set()
+        used = 0
+        for i in order:
+            category_index, _, category, subtopic, _ = entries[i]
+            cost = estimate_tokens(f"  - {subtopic}\n")
+            if category_index not in headings:
+                cost += estimate_tokens(f"{category}:\n")
+            if used + cost > budget:
+                continue
+            chosen.add(i)
+            headings.add(category_index)
+            used += cost
+        
+        selected = {}
+        for i, (_, _, category, subtopic, _) in enumerate(entries):
+            if i in chosen:
+                selected.setdefault(category, []).append(subtopic)
+        context = render_topics(selected)
+        return {
+            "topics": context,
+            "tokens": estimate_tokens(context),
+            "categories": list(selected),
+            "subtopics_used": len(chosen),
+            "subtopics_total": len(entries)
+        }
+
+
+HF_API_URL = os.getenv("HF_API_URL", "https://router.huggingface.co/v1/chat/completions")
+HF_MODEL = os.getenv("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct:novita")
+HF_CONNECT_TIMEOUT = float(os.getenv("HF_CONNECT_TIMEOUT", "5"))
+HF_READ_TIMEOUT = float(os.getenv("HF_READ_TIMEOUT", "120"))
+HF_MAX_RETRIES = int(os.getenv("HF_MAX_RETRIES", "3"))
+HF_BACKOFF_BASE = float(os.getenv("HF_BACKOFF_BASE", "0.5"))
+HF_BACKOFF_MAX = float(os.getenv("HF_BACKOFF_MAX", "30"))
+HF_POOL_SIZE = int(os.getenv("HF_POOL_SIZE", "32"))
+HF_BREAKER_THRESHOLD = int(os.getenv("HF_BREAKER_THRESHOLD", "5"))
+HF_BREAKER_RESET = float(os.getenv("HF_BREAKER_RESET", "30"))
+
+# JSON list of OpenAI-compatible backends, e.g.
+# [{"name": "local", "url": "http://127.0.0.1:8000/v1/chat/completions", "model": "llama", "weight": 3},
+#  {"name": "router", "url": "https://router.huggingface.co/v1/chat/completions", "api_key_env": "HF_TOKEN"}]
+# Empty means the single HF_API_URL / HF_MODEL backend.
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "10"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+BACKEND_LATENCY_WINDOW = int(os.getenv("BACKEND_LATENCY_WINDOW", "256"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+GENERATION_MAX_TOKENS = int(os.getenv("GENERATION_MAX_TOKENS", "2000"))
+GENERATION_TEMPERATURE = float(os.getenv("GENERATION_TEMPERATURE", "0.8"))
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "1024"))
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))
+GENERATION_CACHE_DISK_MAX = int(os.getenv("GENERATION_CACHE_DISK_MAX", "100000"))
+GENERATION_CACHE_PATH = os.getenv(
+    "GENERATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "generation_cache.sqlite3")
+)
+QUESTION_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "question_bank.sqlite3")
+)
+QUESTION_DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_DUPLICATE_THRESHOLD", "0.7"))
+COALESCE_WAIT_TIMEOUT = float(os.getenv("COALESCE_WAIT_TIMEOUT", "300"))
+PAPER_CONCURRENCY = int(os.getenv("PAPER_CONCURRENCY", "8"))
+PAPER_MAX_QUESTIONS = int(os.getenv("PAPER_MAX_QUESTIONS", "50"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))
+JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", "15"))
+JOB_FINISHED = {"done", "failed"}
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "0") == "1"
+WARMUP_SECTIONS = os.getenv("WARMUP_SECTIONS", "2:5,5:3,10:2")
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "1"))
+WARMUP_RATE = float(os.getenv("WARMUP_RATE", "0.2"))
+WARMUP_QUEUE_MAX = int(os.getenv("WARMUP_QUEUE_MAX", "1000"))
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+class CompletionError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stop calling an upstream that keeps failing, then probe it again after a cool-down."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def is_open(self):
+        """True while calls would be refused; unlike ``allow`` this does not claim the probe."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            return self.probing or time.monotonic() - self.opened_at < self.reset_timeout
+
+
+class LLMBackend:
+    """One OpenAI-compatible chat completions endpoint, with its own breaker and latency window."""
+
+    def __init__(self, name, url, model, weight=1.0, api_key=None, api_key_env="HF_TOKEN"):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.weight = weight
+        self.api_key = api_key
+        self.api_key_env = api_key_env
+        self.circuit = CircuitBreaker(HF_BREAKER_THRESHOLD, HF_BREAKER_RESET)
+        self.latencies = deque(maxlen=BACKEND_LATENCY_WINDOW)
+        self.counters = {"requests": 0, "failures": 0, "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def token(self):
+        return self.api_key or os.getenv(self.api_key_env)
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.counters["requests"] += 1
+            if ok:
+                self.latencies.append(seconds)
+            else:
+                self.counters["failures"] += 1
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def quantile(self, q):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, samples=len(self.latencies))
+        p50 = self.quantile(0.5)
+        p95 = self.quantile(0.95)
+        stats.update({
+            "name": self.name,
+            "model": self.model,
+            "weight": self.weight,
+            "available": not self.circuit.is_open(),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None
+        })
+        return stats
+
+
+class BackendRouter:
+    """Spread model calls over weighted backends, skipping those whose breaker is open.
+
+    With more than one backend a call that fails is retried once on each
+    other backend, and a call still running after its backend's p95
+    latency (``hedge_delay``), counted from when a pool thread starts it,
+    is hedged: the same request goes to another backend and whichever
+    answers first wins. The slower call is left to
+    finish in the background and only feeds the latency window. A call
+    that waits ``HF_READ_TIMEOUT`` for a pool thread fails instead.
+    """
+
+    def __init__(self, backends, hedge, pool):
+        if not backends:
+            raise ValueError("At least one model backend is required.")
+        self.backends = backends
+        self.hedge = hedge
+        self.pool = pool
+
+    @property
+    def signature(self):
+        """Identifies the models answers may come from, for cache keys."""
+        return "|".join(sorted({backend.model for backend in self.backends}))
+
+    def choose(self, exclude=()):
+        candidates = [backend for backend in self.backends if backend not in exclude]
+        healthy = [backend for backend in candidates if not backend.circuit.is_open()]
+        candidates = healthy or candidates
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=[backend.weight for backend in candidates])[0]
+
+    def hedge_delay(self, backend):
+        if len(backend.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, backend.quantile(HEDGE_QUANTILE))
+
+    def complete(self, call):
+        """Return ``call(backend)`` from the first backend to succeed."""
+        primary = self.choose()
+        if len(self.backends) == 1:
+            return call(primary)
+        
+        tried = []
+        pending = {}
+        began = {}
+        started_at = {}
+        
+        def run(backend):
+            started_at[backend] = time.monotonic()
+            began[backend].set()
+            return call(backend)
+        
+        def submit(backend):
+            tried.append(backend)
+            began[backend] = threading.Event()
+            pending[self.pool.submit(run, backend)] = backend
+        
+        submit(primary)
+        error = None
+        while pending:
+            timeout = None
+            if self.hedge and len(pending) == 1 and len(tried) < len(self.backends):
+                backend = next(iter(pending.values()))
+                # The hedge clock starts when a pool thread picks the call up:
+                # time spent queued behind a saturated pool is not upstream
+                # latency, and hedging it would only double the load. A call
+                # still queued after a whole read timeout is given up on.
+                if not began[backend].wait(HF_READ_TIMEOUT):
+                    if next(iter(pending)).cancel():
+                        raise CompletionError("Timed out waiting for a free model call thread.")
+                    began[backend].wait()
+                timeout = max(0.0, self.hedge_delay(backend) - (time.monotonic() - started_at[backend]))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                backend = self.choose(exclude=tried)
+                backend.count("hedges")
+                hedged_requests.inc("fired")
+                submit(backend)
+                continue
+            
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if pending:
+                    backend.count("hedge_wins")
+                    hedged_requests.inc("won")
+                return result
+            
+            if not pending and len(tried) < len(self.backends):
+                submit(self.choose(exclude=tried))
+        raise error
+
+    def stats(self):
+        return [backend.stats() for backend in self.backends]
+
+
+def load_backends(spec):
+    if not spec.strip():
+        return [LLMBackend("default", HF_API_URL, HF_MODEL)]
+    backends = []
+    for index, entry in enumerate(json.loads(spec)):
+        backends.append(LLMBackend(
+            entry.get("name") or f"backend-{index}",
+            entry["url"],
+            entry.get("model", HF_MODEL),
+            float(entry.get("weight", 1.0)),
+            entry.get("api_key"),
+            entry.get("api_key_env", "HF_TOKEN")
+        ))
+    return backends
+
+
+class InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self, timeout):
+        if not self.done.wait(timeout):
+            raise CompletionError("Timed out waiting for an identical request in progress.")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Let concurrent callers with the same key share one in-progress call.
+
+    The first caller for a key becomes the leader and does the work; callers
+    arriving before it finishes wait for and receive the leader's result or
+    exception. Nothing is kept once the call completes.
+    """
+
+    def __init__(self, wait_timeout):
+        self.wait_timeout = wait_timeout
+        self.calls = {}
+        self.led = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Return ``(call, leader)``; a leader must later call ``finish``."""
+        with self._lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                return call, False
+            call = self.calls[key] = InFlightCall()
+            self.led += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        with self._lock:
+            if self.calls.get(key) is call:
+                del self.calls[key]
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def do(self, key, fn):
+        """Run ``fn()`` once for all concurrent callers; returns ``(result, shared)``."""
+        call, leader = self.begin(key)
+        if not leader:
+            return call.wait(self.wait_timeout), True
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self.calls)
+        return {"in_flight": in_flight, "led": self.led, "coalesced": self.coalesced}
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("job queue is full")
+        self.retry_after = retry_after
+
+
+class LocalJobQueue:
+    """In-process priority queue drained by a fixed pool of daemon worker threads.
+
+    Jobs are plain dicts kept for ``retention`` seconds after they finish.
+    Submitting beyond ``max_queued`` waiting jobs raises ``QueueFullError``
+    with a retry hint estimated from recent job durations.
+    """
+
+    def __init__(self, workers, max_queued, retention):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.jobs = {}
+        self.queue = queue.PriorityQueue()
+        self.queued = 0
+        self.average_duration = 1.0
+        self.sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+
+    def submit(self, job_type, fn, priority=0):
+        with self._lock:
+            self._purge()
+            if self.queued >= self.max_queued:
+                raise QueueFullError(self._retry_after())
+            self._start_workers()
+            job_id = uuid.uuid4().hex
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "type": job_type,
+                "priority": priority,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self.queued += 1
+            self.queue.put((-priority, next(self.sequence), job_id, fn))
+            return dict(self.jobs[job_id])
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout):
+        """Return the job once it changes status or finishes, or after ``timeout``."""
+        with self._changed:
+            job = self.jobs.get(job_id)
+            if job and job["status"] not in JOB_FINISHED:
+                status = job["status"]
+                self._changed.wait_for(
+                    lambda: self.jobs.get(job_id, {}).get("status") != status, timeout
+                )
+                job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self.jobs.values() if job["status"] == "running")
+            return {
+                "queued": self.queued,
+                "running": running,
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "average_duration": round(self.average_duration, 3)
+            }
+
+    def _retry_after(self):
+        waves = self.queued / max(self.workers, 1)
+        return max(1, int(waves * self.average_duration + 0.5))
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job["finished_at"] is not None and job["finished_at"] < cutoff]:
+            del self.jobs[job_id]
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _update(self, job_id, **fields):
+        with self._changed:
+            self.jobs[job_id].update(fields)
+            self._changed.notify_all()
+
+    def _work(self):
+        while True:
+            _, _, job_id, fn = self.queue.get()
+            with self._lock:
+                self.queued -= 1
+            started = time.monotonic()
+            self._update(job_id, status="running", started_at=time.time())
+            try:
+                result = fn()
+            except Exception as e:
+                self._update(job_id, status="failed", error=describe_completion_error(e), finished_at=time.time())
+            else:
+                self._update(job_id, status="done", result=result, finished_at=time.time())
+            with self._lock:
+                self.average_duration = 0.8 * self.average_duration + 0.2 * (time.monotonic() - started)
+
+
+class WarmupScheduler:
+    """Background pre-generation of per-CO work, started no faster than ``rate`` per second.
+
+    Work is keyed by ``(syllabus_id, co_code)``; scheduling a key that is
+    already waiting is a no-op. ``touch`` raises a waiting key's priority
+    each time the CO is requested, so COs teachers are actively using
+    are warmed first. Priorities change in place: the heap may hold stale
+    entries, which are skipped when popped.
+    """
+
+    def __init__(self, fn, workers, rate, max_queued):
+        self.fn = fn
+        self.workers = workers
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_queued = max_queued
+        self.priorities = {}
+        self.heap = []
+        self.running = set()
+        self.sequence = itertools.count()
+        self.next_start = 0.0
+        self.counters = {"scheduled": 0, "warmed": 0, "skipped": 0, "failed": 0, "dropped": 0}
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._threads = []
+
+    def schedule(self, syllabus_id, co_codes):
+        with self._ready:
+            for co_code in co_codes:
+                key = (syllabus_id, co_code)
+                if key in self.priorities or key in self.running:
+                    continue
+                if len(self.priorities) >= self.max_queued:
+                    self.counters["dropped"] += 1
+                    continue
+                self.priorities[key] = 0
+                heapq.heappush(self.heap, (0, next(self.sequence), key))
+                self.counters["scheduled"] += 1
+            self._start_workers()
+            self._ready.notify_all()
+
+    def touch(self, syllabus_id, co_code):
+        key = (syllabus_id, co_code)
+        with self._lock:
+            if key not in self.priorities:
+                return
+            self.priorities[key] += 1
+            heapq.heappush(self.heap, (-self.priorities[key], next(self.sequence), key))
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, queued=len(self.priorities), running=len(self.running))
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"warmup-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_key(self):
+        with self._ready:
+            while True:
+                while self.heap:
+                    priority, _, key = heapq.heappop(self.heap)
+                    if self.priorities.get(key) == -priority:
+                        del self.priorities[key]
+                        self.running.add(key)
+                        delay = self.next_start - time.monotonic()
+                        self.next_start = max(self.next_start, time.monotonic()) + self.interval
+                        return key, delay
+                self._ready.wait()
+
+    def _work(self):
+        while True:
+            key, delay = self._next_key()
+            if delay > 0:
+                time.sleep(delay)
+            outcome = "failed"
+            try:
+                outcome = "warmed" if self.fn(*key) else "skipped"
+            except Exception:
+                outcome = "failed"
+            finally:
+                with self._lock:
+                    self.running.discard(key)
+                    self.counters[outcome] += 1
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        upstream_seconds.observe(time.perf_counter() - started, "connect")
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        upstream_seconds.observe(time.perf_counter() - started, "connect")
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def create_http_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HF_POOL_SIZE, pool_maxsize=HF_POOL_SIZE, max_retries=0)
+    # Time new connections (TCP + TLS) separately from the requests that reuse them.
+    adapter.poolmanager.pool_classes_by_scheme = {
+        "http": TimedHTTPConnectionPool,
+        "https": TimedHTTPSConnectionPool
+    }
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
-    co_map = {}
-    
-    if not syllabus_data or "syllabus_structure" not in syllabus_data:
-        return co_map
-    
-    units = syllabus_data["syllabus_structure"].get("units", [])
-    
-    for unit in units:
-        co_code = unit.get("course_outcome")
-        if co_code:
-            
-            topics = unit.get("topics", {})
-    
-            topic_text = ""
-            for category, subtopics in topics.items():
-                topic_text += f"{category}:\n"
-                for subtopic in subtopics:
-                    topic_text += f"  - {subtopic}\n"
-            
-            if topic_text:
-     
-                co_map[co_code] = {
-                    "unit_title": unit.get("title", ""),
-                    "unit_id": unit.get("unit_id", ""),
-                    "topics": topic_text,
-                    "full_unit": unit
-                }
-    
-    return co_map
-def get_context_for_co(co_code):
-
-    if not syllabus_data:
+http_session = create_http_session()
+hedge_pool = ThreadPoolExecutor(max_workers=2 * HF_POOL_SIZE, thread_name_prefix="upstream")
+backend_router = BackendRouter(load_backends(LLM_BACKENDS), HEDGE_ENABLED, hedge_pool)
+hf_circuit = backend_router.backends[0].circuit
+generation_cache = GenerationCache(
+    GENERATION_CACHE_PATH, GENERATION_CACHE_SIZE, GENERATION_CACHE_TTL, GENERATION_CACHE_DISK_MAX
+)
+generation_flights = SingleFlight(COALESCE_WAIT_TIMEOUT)
+paper_pool = ThreadPoolExecutor(max_workers=PAPER_CONCURRENCY, thread_name_prefix="paper")
+job_queue = LocalJobQueue(JOB_WORKERS, JOB_QUEUE_MAX, JOB_RETENTION)
+question_bank = QuestionBank(QUESTION_BANK_PATH, QUESTION_DUPLICATE_THRESHOLD)
+warmup_scheduler = WarmupScheduler(
+    lambda syllabus_id, co_code: warm_course_outcome(syllabus_id, co_code),
+    WARMUP_WORKERS,
+    WARMUP_RATE,
+    WARMUP_QUEUE_MAX
+)
+
+
+def generation_cache_key(context, co_code, prompt):
+    # Keyed on the CO's unit context rather than the syllabus ID, so answers
+    # survive a revised upload as long as that CO's unit did not change.
+    normalized_prompt = " ".join(prompt.lower().split())
+    key = json.dumps([
+        context, co_code, normalized_prompt, backend_router.signature, GENERATION_MAX_TOKENS, GENERATION_TEMPERATURE
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
         return None
-    
 
-    if co_code in CO_TO_UNIT_MAP:
-        context = CO_TO_UNIT_MAP[co_code]["topics"]
-       
-        bloom_level = "Remember" 
+
+def retry_delay(attempt, response=None):
+    if response is not None:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, HF_BACKOFF_MAX)
+    return random.uniform(0, min(HF_BACKOFF_MAX, HF_BACKOFF_BASE * 2 ** attempt))
+
+
+def post_with_retries(url, headers, payload, circuit=None, **kwargs):
+    """POST through the shared session, retrying connection errors and 429/5xx responses."""
+    circuit = circuit or hf_circuit
+    if not circuit.allow():
+        raise CircuitOpenError("AI service is temporarily unavailable; retrying shortly.")
+    
+    for attempt in range(HF_MAX_RETRIES + 1):
+        try:
+            response = http_session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=(HF_CONNECT_TIMEOUT, HF_READ_TIMEOUT),
+                **kwargs
+            )
+        except requests.exceptions.ConnectionError:
+            if attempt == HF_MAX_RETRIES:
+                circuit.record_failure()
+                raise
+            time.sleep(retry_delay(attempt))
+            continue
+        except requests.exceptions.RequestException:
+            circuit.record_failure()
+            raise
         
-        if syllabus_data.get("course_metadata", {}).get("course_outcomes"):
-            for co in syllabus_data["course_metadata"]["course_outcomes"]:
-                if co["code"] == co_code:
-                    
-                    bloom_code = co.get("blooms_level", "K1")
-                    bloom_mapping = {
-                        "K1": "Remember",
-                        "K2": "Understand", 
-                        "K3": "Apply",
-                        "K4": "Analyze",
-                        "K5": "Evaluate",
-                        "K6": "Create"
-                    }
-                    bloom_level = bloom_mapping.get(bloom_code, "Remember")
-                    break
+        if response.status_code in RETRYABLE_STATUS_CODES and attempt < HF_MAX_RETRIES:
+            delay = retry_delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+            continue
         
-        return {
-            "topics": context,
-            "bloom_level": bloom_level
-        }
-    
-    return None
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            circuit.record_failure()
+        else:
+            circuit.record_success()
+        return response
 
-def query_huggingface(prompt, context=None):
 
-    API_URL = "https://router.huggingface.co/v1/chat/completions"
-    
+@timed_stage
+def build_chat_request(prompt, context=None, backend=None):
+
+    backend = backend or backend_router.backends[0]
     headers = {
-        "Authorization": f"Bearer {os.getenv('HF_TOKEN')}",
+        "Authorization": f"Bearer {backend.token}",
         "Content-Type": "application/json"
     }
   
@@ -417,34 +3081,205 @@ def query_huggingface(prompt, context=None):
         {"role": "user", "content": prompt}
     ]
     
+    payload = {
+        "model": backend.model,
+        "messages": messages,
+        "max_tokens": GENERATION_MAX_TOKENS,
+        "temperature": GENERATION_TEMPERATURE
+    }
+    
+    return headers, payload
+
+def complete_with_backend(backend, prompt, context=None):
+    """One backend's answer, raising on transport or response errors."""
+    headers, payload = build_chat_request(prompt, context, backend)
+    
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        response = requests.post(
-            API_URL,
-            headers=headers,
-            json={
-                "model": "meta-llama/Llama-3.1-8B-Instruct:novita",
-                "messages": messages,
-                "max_tokens": 2000,
-                "temperature": 0.8
-            }
-        )
+        response = post_with_retries(backend.url, headers, payload, circuit=backend.circuit)
+        upstream_seconds.observe(response.elapsed.total_seconds(), "ttfb")
         response.raise_for_status()
         result = response.json()
+        record_token_usage(result.get("usage"))
         
         if "choices" in result and len(result["choices"]) > 0:
+            outcome = "ok"
             return result["choices"][0]["message"]["content"]
-        else:
-            return "Error: No response from AI model."
-            
-    except requests.exceptions.RequestException as e:
-        return f"Error connecting to AI service: {str(e)}"
-    except Exception as e:
-        return f"Error processing AI response: {str(e)}"
+        raise CompletionError("No response from AI model.")
+    finally:
+        backend.record(time.perf_counter() - started, outcome == "ok")
+        backend_requests.inc(backend.name, outcome)
+
+def request_completion(prompt, context=None):
+    """Return the model's answer, raising on transport or response errors."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        answer = backend_router.complete(lambda backend: complete_with_backend(backend, prompt, context))
+        outcome = "ok"
+        return answer
+    finally:
+        elapsed = time.perf_counter() - started
+        upstream_seconds.observe(elapsed, "total")
+        upstream_requests.inc(outcome)
+        record_server_timing("upstream", elapsed)
+
+def record_token_usage(usage):
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if isinstance(usage.get(kind), int):
+            upstream_tokens.inc(kind[:-len("_tokens")], amount=usage[kind])
+
+def describe_completion_error(error):
+    if isinstance(error, CompletionError):
+        return f"Error: {str(error)}"
+    if isinstance(error, requests.exceptions.RequestException):
+        return f"Error connecting to AI service: {str(error)}"
+    return f"Error processing AI response: {str(error)}"
+
+def open_completion_stream(prompt, context=None):
+    """Start a streamed completion, failing over to other backends until one accepts it.
+
+    Returns ``(backend, response)``. Streams are not hedged: once tokens
+    are relayed to the client the backend cannot change.
+    """
+    tried = []
+    error = CompletionError("No model backend is available.")
+    while True:
+        backend = backend_router.choose(exclude=tried)
+        if backend is None:
+            raise error
+        tried.append(backend)
+        headers, payload = build_chat_request(prompt, context, backend)
+        payload["stream"] = True
+        response = None
+        try:
+            response = post_with_retries(backend.url, headers, payload, circuit=backend.circuit, stream=True)
+            upstream_seconds.observe(response.elapsed.total_seconds(), "ttfb")
+            response.raise_for_status()
+            return backend, response
+        except requests.exceptions.RequestException as e:
+            if response is not None:
+                response.close()
+            backend_requests.inc(backend.name, "error")
+            backend.record(0.0, False)
+            error = e
+
+def stream_huggingface(prompt, context=None):
+    """Yield completion text chunks as the model produces them."""
+    started = time.perf_counter()
+    first_token = True
+    outcome = "error"
+    backend = None
+    response = None
+    try:
+        backend, response = open_completion_stream(prompt, context)
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            record_token_usage(chunk.get("usage"))
+            choices = chunk.get("choices") or []
+            if choices:
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    if first_token:
+                        upstream_seconds.observe(time.perf_counter() - started, "first_token")
+                        first_token = False
+                    yield text
+        outcome = "ok"
+    finally:
+        if response is not None:
+            response.close()
+        elapsed = time.perf_counter() - started
+        if backend is not None:
+            backend.record(elapsed, outcome == "ok")
+            backend_requests.inc(backend.name, outcome)
+        upstream_seconds.observe(elapsed, "total")
+        upstream_requests.inc(outcome)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "512"))
+
+
+def dump_json(data):
+    """Serialise like ``jsonify`` (sorted keys, compact, trailing newline), through orjson when it is installed.
+
+    Non-ASCII text is written as UTF-8 rather than ``\\u`` escapes.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def syllabus_payload(syllabus, key, build):
+    """Serialise ``build()`` once per syllabus and key, tagged with a strong ETag of its bytes.
+
+    A syllabus ID names immutable content, so the payload never goes stale;
+    it is dropped with the store entry.
+    """
+    payloads = syllabus["payloads"]
+    payload = payloads.get(key)
+    if payload is None:
+        body = dump_json(build())
+        payload = {
+            "body": body,
+            "etag": hashlib.blake2b(body, digest_size=16).hexdigest(),
+            "encoded": {}
+        }
+        payloads[key] = payload
+    return payload
+
+
+def choose_encoding(payload):
+    if len(payload["body"]) < RESPONSE_COMPRESS_MIN_BYTES:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def send_payload(payload):
+    """Answer a read with a cached payload: 304 on a matching ``If-None-Match``, else compressed if accepted.
+
+    Each content-coding is its own representation with its own strong ETag
+    (``<etag>-gzip``); ``If-None-Match`` uses the weak comparison.
+    """
+    encoding = choose_encoding(payload)
+    etag = f"{payload['etag']}-{encoding}" if encoding else payload["etag"]
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body = payload["body"]
+        if encoding:
+            body = payload["encoded"].get(encoding)
+            if body is None:
+                if encoding == "br":
+                    body = brotli.compress(payload["body"])
+                else:
+                    body = gzip.compress(payload["body"], compresslevel=6, mtime=0)
+                payload["encoded"][encoding] = body
+        response = Response(body, mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
 
 @app.route("/upload-pdf", methods=["POST"])
 def upload_pdf():
     """Upload and parse syllabus PDF"""
-    global syllabus_data, CO_TO_UNIT_MAP
     
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
@@ -455,89 +3290,75 @@ def upload_pdf():
         return jsonify({"error": "Only PDF files allowed"}), 400
 
     try:
-        text = extract_text_from_pdf(file)
-        
- 
-        course_metadata = parse_course_metadata(text)
-        units = parse_units(text)
-        total_periods_info = parse_total_periods(text)
-        references = parse_references(text)
-        co_po_pso = parse_co_po_pso_table(text)
-        assessment = parse_assessment_details(text)
-        
-        syllabus_data = {
-            "course_metadata": course_metadata,
-            "syllabus_structure": {
-                "total_units": len(units),
-                "unit_periods": units[0]["periods"] if units else None,
-                "units": units,
-                "total_periods_info": total_periods_info
-            },
-            "assessment_details": assessment,
-            "references": references,
-            "co_po_pso_mapping": co_po_pso
-        }
-        
-  
-        CO_TO_UNIT_MAP = build_co_to_unit_map(syllabus_data)
+        with SpooledUpload(file.stream, UPLOAD_MAX_BYTES) as upload:
+            if b"%PDF-" not in upload.head:
+                return jsonify({"error": "File is not a valid PDF"}), 400
+            syllabus, cached = load_syllabus(upload)
+        model = syllabus["model"]
         
-
-        available_cos = list(CO_TO_UNIT_MAP.keys())
+        warmup = request.args.get("warmup")
+        if warmup == "1" or (WARMUP_ENABLED and warmup != "0"):
+            schedule_warmup(syllabus)
         
         response = {
             "message": "Syllabus uploaded successfully",
-            "available_cos": available_cos,
+            "syllabus_id": syllabus["syllabus_id"],
+            "cached": cached,
+            "available_cos": model.available_cos,
             "course_info": {
-                "course_code": syllabus_data["course_metadata"].get("course_code"),
-                "course_name": syllabus_data["course_metadata"].get("course_name"),
-                "total_units": len(units)
+                "course_code": model.course_code,
+                "course_name": model.course_name,
+                "total_units": len(model.units)
             }
         }
         
         return jsonify(response)
         
+    except UploadRejected as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         return jsonify({"error": f"Error processing PDF: {str(e)}"}), 500
 
-@app.route("/ask-question", methods=["POST"])
-def ask_question():
-   
-    global syllabus_data, CO_TO_UNIT_MAP
-    
- 
-    if not syllabus_data:
-        return jsonify({"error": "No syllabus loaded. Please upload a PDF first."}), 400
-  
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "No data provided"}), 400
-    
-    co_code = data.get("course_outcome")
-    prompt = data.get("prompt")
+@app.route("/upload-zip", methods=["POST"])
+def upload_zip():
+    """Ingest every PDF in a zip archive, streaming one NDJSON line per file as it finishes."""
     
-    if not co_code:
-        return jsonify({"error": "course_outcome is required"}), 400
-    if not prompt:
-        return jsonify({"error": "prompt is required"}), 400
-    
- 
-    if not re.match(r'^CO\d+$', co_code, re.IGNORECASE):
-        return jsonify({"error": "Invalid CO format. Use format like 'CO1', 'CO2', etc."}), 400
-    
-    co_code = co_code.upper()
+    request.max_content_length = BULK_MAX_ARCHIVE_BYTES + UPLOAD_CHUNK_BYTES
+    if "file" not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
     
-    if co_code not in CO_TO_UNIT_MAP:
-        available_cos = list(CO_TO_UNIT_MAP.keys())
-        return jsonify({
-            "error": f"CO '{co_code}' not found in syllabus.",
-            "available_cos": available_cos
-        }), 404
+    file = request.files["file"]
     
-    context_data = get_context_for_co(co_code)
-    context = context_data["topics"] if context_data else ""
+    if not file.filename.lower().endswith(".zip"):
+        return jsonify({"error": "Only zip archives allowed"}), 400
+    # The upload is closed with the request, before the streamed body is sent.
+    archive = tempfile.TemporaryFile()
+    try:
+        copy_upload(file.stream, archive, BULK_MAX_ARCHIVE_BYTES)
+    except UploadRejected as e:
+        archive.close()
+        return jsonify({"error": str(e)}), e.status_code
+    if not zipfile.is_zipfile(archive):
+        archive.close()
+        return jsonify({"error": "File is not a valid zip archive"}), 400
+    archive.seek(0)
     
-    unit_topics = CO_TO_UNIT_MAP[co_code]['full_unit'].get('topics', {})
+    def generate():
+        try:
+            for event in ingest_pdfs(iter_zip_pdfs(archive)):
+                yield json.dumps(event) + "\n"
+        finally:
+            archive.close()
     
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@timed_stage
+def build_question_prompt(prompt):
+
     enhanced_prompt = f"""
     User Request: {prompt}
     
@@ -580,39 +3401,571 @@ def ask_question():
     Now generate the requested questions: "{prompt}"
     """
     
+    return enhanced_prompt
+
+def prepare_question(data):
+    """Validate a question request and collect the prompt, context and response envelope.
+
+    Returns ``(question, None)`` on success or ``(None, error_response)``.
+    """
+    if not data:
+        return None, (jsonify({"error": "No data provided"}), 400)
     
-    answer = query_huggingface(enhanced_prompt, context)
+    syllabus_id = data.get("syllabus_id")
+    syllabus = resolve_syllabus(syllabus_id)
+    if not syllabus:
+        return None, syllabus_not_found(syllabus_id)
     
-   
-    response = {
-        "course_outcome": co_code,
-        "unit": CO_TO_UNIT_MAP[co_code]['unit_title'],
-        "question": prompt,
-        "answer": answer,
-        "context_info": {
-            "unit_id": CO_TO_UNIT_MAP[co_code]['unit_id'],
-            "topics_covered": list(unit_topics.keys())
+    model = syllabus["model"]
+    
+    co_code = data.get("course_outcome")
+    prompt = data.get("prompt")
+    
+    if not co_code:
+        return None, (jsonify({"error": "course_outcome is required"}), 400)
+    if not prompt:
+        return None, (jsonify({"error": "prompt is required"}), 400)
+    
+ 
+    if not re.match(r'^CO\d+$', co_code, re.IGNORECASE):
+        return None, (jsonify({"error": "Invalid CO format. Use format like 'CO1', 'CO2', etc."}), 400)
+    
+    co_code = co_code.upper()
+    
+    unit = model.unit_for(co_code)
+    if unit is None:
+        return None, (jsonify({
+            "error": f"CO '{co_code}' not found in syllabus.",
+            "available_cos": model.available_cos
+        }), 404)
+    
+    warmup_scheduler.touch(syllabus["syllabus_id"], co_code)
+    
+    selection = model.select_context(co_code, prompt)
+    context = selection["topics"]
+    enhanced_prompt = build_question_prompt(prompt)
+    
+    return {
+        "syllabus": syllabus,
+        "co_code": co_code,
+        "prompt": prompt,
+        "enhanced_prompt": enhanced_prompt,
+        "context": context,
+        "cache_key": generation_cache_key(context, co_code, prompt),
+        "use_cache": data.get("cache") != "bypass",
+        "bloom_request": requested_bloom_levels(prompt),
+        "envelope": {
+            "syllabus_id": syllabus["syllabus_id"],
+            "course_outcome": co_code,
+            "unit": unit.title,
+            "question": prompt,
+            "context_info": {
+                "unit_id": unit.unit_id,
+                "topics_covered": selection["categories"],
+                "subtopics_used": selection["subtopics_used"],
+                "subtopics_total": selection["subtopics_total"],
+                "context_tokens": selection["tokens"],
+                "prompt_tokens": selection["tokens"] + estimate_tokens(enhanced_prompt)
+            }
         }
-    }
+    }, None
+
+def structure_answer(question, answer):
+    """Parse an answer into question records and check its Bloom levels against the request."""
+    records = parse_generated_questions(answer, question["co_code"])
+    return {"questions": records, "bloom_check": check_bloom_distribution(records, *question["bloom_request"])}
+
+def remember_answer(question, answer):
+    """Cache a fresh model answer and file its questions in the question bank."""
+    generation_cache.put(question["cache_key"], answer)
+    question_bank.add(
+        question["syllabus"]["syllabus_id"], question["co_code"],
+        parse_generated_questions(answer, question["co_code"])
+    )
+
+def answer_question(question):
+    """Answer a prepared question from the cache or the model; returns ``(answer, cached)``.
+
+    Identical questions asked while one is already being generated wait for
+    that generation instead of calling the model again, unless the caller
+    bypasses the cache and so wants a fresh answer. Raises when the model
+    call fails.
+    """
+    if question["use_cache"]:
+        answer = generation_cache.get(question["cache_key"])
+        if answer is not None:
+            return answer, True
+    
+    def complete():
+        answer = request_completion(question["enhanced_prompt"], question["context"])
+        remember_answer(question, answer)
+        return answer
+    
+    if not question["use_cache"]:
+        return complete(), False
+    return generation_flights.do(question["cache_key"], complete)
+
+@app.route("/ask-question", methods=["POST"])
+def ask_question():
+  
+    question, error = prepare_question(request.get_json())
+    if error:
+        return error
+    
+    try:
+        answer, cached = answer_question(question)
+    except Exception as e:
+        return jsonify(dict(question["envelope"], answer=describe_completion_error(e), cached=False))
+    
+    response = dict(question["envelope"], answer=answer, cached=cached, **structure_answer(question, answer))
     
     return jsonify(response)
 
+@app.route("/ask-question/stream", methods=["POST"])
+def ask_question_stream():
+    """Same as /ask-question, but relays the answer as Server-Sent Events.
+
+    Emits ``start`` (the response envelope), one ``token`` per chunk and a
+    ``question`` record as soon as each question's line is complete, then
+    ``end`` (the envelope plus the full answer, all questions and the Bloom
+    check), or ``error`` on failure.
+    """
+    question, error = prepare_question(request.get_json())
+    if error:
+        return error
+    
+    envelope = question["envelope"]
+    
+    def replay(answer):
+        yield sse_event("token", {"text": answer})
+        structured = structure_answer(question, answer)
+        for record in structured["questions"]:
+            yield sse_event("question", record)
+        yield sse_event("end", dict(envelope, answer=answer, cached=True, **structured))
+    
+    def generate():
+        yield sse_event("start", envelope)
+        
+        if question["use_cache"]:
+            answer = generation_cache.get(question["cache_key"])
+            if answer is not None:
+                yield from replay(answer)
+                return
+        
+        cache_key = question["cache_key"]
+        if question["use_cache"]:
+            call, leader = generation_flights.begin(cache_key)
+        else:
+            call, leader = None, True
+        if not leader:
+            try:
+                answer = call.wait(generation_flights.wait_timeout)
+            except Exception as e:
+                yield sse_event("error", {"error": describe_completion_error(e)})
+                return
+            yield from replay(answer)
+            return
+        
+        chunks = []
+        parser = QuestionStreamParser(question["co_code"])
+        error = CompletionError("Generation was cancelled.")
+        try:
+            for text in stream_huggingface(question["enhanced_prompt"], question["context"]):
+                chunks.append(text)
+                yield sse_event("token", {"text": text})
+                for record in parser.feed(text):
+                    yield sse_event("question", record)
+            for record in parser.close():
+                yield sse_event("question", record)
+            error = None
+        except Exception as e:
+            error = e
+            yield sse_event("error", {"error": describe_completion_error(e)})
+            return
+        finally:
+            answer = "".join(chunks)
+            if error is None and answer:
+                remember_answer(question, answer)
+            if call is not None:
+                generation_flights.finish(cache_key, call, result=answer, error=error)
+        yield sse_event("end", dict(
+            envelope, answer=answer, cached=False, questions=parser.questions,
+            bloom_check=check_bloom_distribution(parser.questions, *question["bloom_request"])
+        ))
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def parse_paper_sections(sections):
+    """Validate a blueprint's sections; returns ``(sections, None)`` or ``(None, error)``."""
+    if not isinstance(sections, list) or not sections:
+        return None, "sections must be a non-empty list"
+    
+    parsed = []
+    total = 0
+    for section in sections:
+        if not isinstance(section, dict):
+            return None, "each section must be an object"
+        marks = section.get("marks")
+        count = section.get("count")
+        if not isinstance(marks, int) or isinstance(marks, bool) or marks <= 0:
+            return None, "each section needs a positive integer 'marks'"
+        if not isinstance(count, int) or isinstance(count, bool) or count <= 0:
+            return None, "each section needs a positive integer 'count'"
+        total += count
+        parsed_section = {
+            "name": str(section.get("name") or f"{marks}-mark questions"),
+            "marks": marks,
+            "count": count
+        }
+        if section.get("bloom_level") is not None:
+            bloom_level = normalize_bloom_tag(str(section["bloom_level"]))
+            if bloom_level is None:
+                return None, f"bloom_level must be one of {', '.join(BLOOM_LEVELS.values())}"
+            parsed_section["bloom_level"] = bloom_level
+        parsed.append(parsed_section)
+    
+    if total > PAPER_MAX_QUESTIONS:
+        return None, f"a paper may ask for at most {PAPER_MAX_QUESTIONS} questions per course outcome"
+    return parsed, None
+
+@timed_stage
+def build_paper_prompt(sections):
+    lines = ["Generate the following questions for this course outcome:"]
+    for section in sections:
+        plural = "question" if section["count"] == 1 else "questions"
+        line = f"- {section['name']}: {section['count']} {plural} of {section['marks']} marks each"
+        if section.get("bloom_level"):
+            line += f", at the {section['bloom_level']} level"
+        lines.append(line)
+    return "\n".join(lines)
+
+def prepare_paper(data):
+    """Validate a paper blueprint and prepare one question per CO.
+
+    Returns ``(paper, None)`` on success or ``(None, error_response)``.
+    """
+    if not data:
+        return None, (jsonify({"error": "No data provided"}), 400)
+    
+    syllabus_id = data.get("syllabus_id")
+    syllabus = resolve_syllabus(syllabus_id)
+    if not syllabus:
+        return None, syllabus_not_found(syllabus_id)
+    
+    sections, message = parse_paper_sections(data.get("sections"))
+    if message:
+        return None, (jsonify({"error": message}), 400)
+    
+    source = data.get("source", "model")
+    if source not in ("model", "bank"):
+        return None, (jsonify({"error": "source must be 'model' or 'bank'"}), 400)
+    
+    co_codes = data.get("course_outcomes") or syllabus["model"].available_cos
+    if not isinstance(co_codes, list):
+        return None, (jsonify({"error": "course_outcomes must be a list"}), 400)
+    
+    prompt = build_paper_prompt(sections)
+    bloom_request = {}
+    for section in sections:
+        if section.get("bloom_level"):
+            bloom_request[section["bloom_level"]] = bloom_request.get(section["bloom_level"], 0) + section["count"]
+    questions = []
+    for co_code in dict.fromkeys(str(code).upper() for code in co_codes):
+        question, error = prepare_question({
+            "syllabus_id": syllabus["syllabus_id"],
+            "course_outcome": co_code,
+            "prompt": prompt,
+            "cache": data.get("cache")
+        })
+        if error:
+            return None, error
+        question["bloom_request"] = (bloom_request, set())
+        questions.append(question)
+    
+    return {"syllabus": syllabus, "sections": sections, "questions": questions, "source": source}, None
+
+def render_question_set(sections, picked):
+    lines = []
+    for section, records in zip(sections, picked):
+        if lines:
+            lines.append("")
+        lines.append(f"{section['name']} ({section['marks']} marks each):")
+        for number, record in enumerate(records, 1):
+            tag = f" [{record['bloom_level']}]" if record["bloom_level"] else ""
+            lines.append(f"{number}. {record['text']}{tag}")
+    return "\n".join(lines)
+
+def answer_from_bank(question, sections):
+    """Fill a CO's sections from the question bank, asking the model only for the shortfall.
+
+    Returns ``(answer, cached)`` like ``answer_question``; ``cached`` is True
+    when no model call was needed. The structured records and counts are
+    added to the question's envelope by ``assemble_paper``. If the top-up
+    call fails, whatever the bank had is returned along with the error.
+    """
+    syllabus_id = question["syllabus"]["syllabus_id"]
+    co_code = question["co_code"]
+    
+    picked = [
+        question_bank.take(syllabus_id, co_code, section["marks"], section["count"], section.get("bloom_level"))
+        for section in sections
+    ]
+    missing = [
+        dict(section, count=section["count"] - len(records))
+        for section, records in zip(sections, picked)
+        if len(records) < section["count"]
+    ]
+    
+    from_bank = sum(len(records) for records in picked)
+    error = None
+    if missing:
+        prompt = build_paper_prompt(missing)
+        try:
+            answer_question(dict(
+                question,
+                prompt=prompt,
+                enhanced_prompt=build_question_prompt(prompt),
+                cache_key=generation_cache_key(question["context"], co_code, prompt),
+                use_cache=False
+            ))
+        except Exception as e:
+            if not from_bank:
+                raise
+            error = describe_completion_error(e)
+        for section, records in zip(sections, picked):
+            shortfall = section["count"] - len(records)
+            if shortfall > 0:
+                records.extend(question_bank.take(
+                    syllabus_id, co_code, section["marks"], shortfall, section.get("bloom_level"),
+                    exclude=[record["id"] for record in records]
+                ))
+    
+    total = sum(len(records) for records in picked)
+    question["bank"] = {
+        "questions": [
+            dict(record, section=section["name"]) for section, records in zip(sections, picked) for record in records
+        ],
+        "from_bank": from_bank,
+        "generated": total - from_bank,
+        "shortfall": sum(section["count"] for section in sections) - total
+    }
+    if error:
+        question["bank"]["error"] = error
+    return render_question_set(sections, picked), not missing
+
+def parse_warmup_sections(spec):
+    """Turn ``"2:5,5:3"`` (marks:count pairs) into paper sections."""
+    sections = []
+    for pair in spec.split(","):
+        if pair.strip():
+            marks, _, count = pair.partition(":")
+            sections.append({"marks": int(marks), "count": int(count or 1)})
+    parsed, message = parse_paper_sections(sections)
+    if message:
+        raise ValueError(f"Invalid WARMUP_SECTIONS '{spec}': {message}")
+    return parsed
+
+def warm_course_outcome(syllabus_id, co_code):
+    """Top up one CO's question bank pools to the warm-up targets; returns False if already full."""
+    missing = []
+    for section in warmup_sections:
+        have = question_bank.count(syllabus_id, co_code, section["marks"])
+        if have < section["count"]:
+            missing.append(dict(section, count=section["count"] - have))
+    if not missing:
+        return False
+    
+    with app.app_context():
+        question, error = prepare_question({
+            "syllabus_id": syllabus_id,
+            "course_outcome": co_code,
+            "prompt": build_paper_prompt(missing)
+        })
+    if error:
+        raise CompletionError(f"Cannot warm {co_code} of syllabus {syllabus_id}.")
+    answer_question(question)
+    return True
+
+def schedule_warmup(syllabus):
+    warmup_scheduler.schedule(syllabus["syllabus_id"], syllabus["model"].available_cos)
+
+warmup_sections = parse_warmup_sections(WARMUP_SECTIONS)
+
+def assemble_paper(paper):
+    """Generate a prepared paper's COs on the paper pool; returns ``(result, status)``."""
+    questions = paper["questions"]
+    sections = paper["sections"]
+    syllabus = paper["syllabus"]
+    
+    started = time.perf_counter()
+    if paper["source"] == "bank":
+        futures = [paper_pool.submit(answer_from_bank, question, sections) for question in questions]
+    else:
+        futures = [paper_pool.submit(answer_question, question) for question in questions]
+    
+    results = []
+    failed = []
+    for question, future in zip(questions, futures):
+        try:
+            answer, cached = future.result()
+        except Exception as e:
+            failed.append(question["co_code"])
+            results.append(dict(question["envelope"], error=describe_completion_error(e)))
+            continue
+        if paper["source"] == "bank":
+            results.append(dict(question["envelope"], answer=answer, cached=cached, **question["bank"]))
+        else:
+            results.append(dict(question["envelope"], answer=answer, cached=cached, **structure_answer(question, answer)))
+    
+    model = syllabus["model"]
+    result = {
+        "syllabus_id": syllabus["syllabus_id"],
+        "course_code": model.course_code,
+        "course_name": model.course_name,
+        "sections": sections,
+        "total_marks": len(questions) * sum(s["marks"] * s["count"] for s in sections),
+        "course_outcomes": results,
+        "failed": failed,
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+    
+    if failed and len(failed) == len(questions):
+        return result, 502
+    return result, 200
+
+@app.route("/generate-paper", methods=["POST"])
+def generate_paper():
+    """Generate every course outcome of a paper blueprint concurrently.
+
+    The blueprint names the COs (all of them by default) and the sections
+    asked of each CO, e.g. ``{"course_outcomes": ["CO1", "CO2"], "sections":
+    [{"name": "Part A", "marks": 2, "count": 5}]}``. COs are generated on a
+    shared pool of ``PAPER_CONCURRENCY`` threads, so the paper takes about as
+    long as its slowest CO rather than the sum of all of them.
+
+    With ``"source": "bank"`` each section is filled from the question bank
+    (optionally restricted to a section's ``bloom_level``) and the model is
+    asked only for the questions the bank is short of.
+    """
+    paper, error = prepare_paper(request.get_json())
+    if error:
+        return error
+    
+    result, status = assemble_paper(paper)
+    return jsonify(result), status
+
+def run_question_job(question):
+    answer, cached = answer_question(question)
+    return dict(question["envelope"], answer=answer, cached=cached, **structure_answer(question, answer))
+
+def run_paper_job(paper):
+    result, status = assemble_paper(paper)
+    if status != 200:
+        raise CompletionError("Every course outcome in the paper failed to generate.")
+    return result
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue a question or paper for background generation and return its job ID.
+
+    The body is an /ask-question request (``"type": "question"``, the default)
+    or a /generate-paper blueprint (``"type": "paper"``), plus an optional
+    integer ``priority``; higher priorities run first. Returns 429 with a
+    ``Retry-After`` header when the queue is full.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    
+    job_type = data.get("type", "question")
+    if job_type == "question":
+        work, error = prepare_question(data)
+        run = run_question_job
+    elif job_type == "paper":
+        work, error = prepare_paper(data)
+        run = run_paper_job
+    else:
+        return jsonify({"error": "type must be 'question' or 'paper'"}), 400
+    if error:
+        return error
+    
+    priority = data.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        return jsonify({"error": "priority must be an integer"}), 400
+    
+    try:
+        job = job_queue.submit(job_type, lambda: run(work), priority)
+    except QueueFullError as e:
+        response = jsonify({"error": "Too many queued jobs, retry later.", "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    
+    response = jsonify(dict(job, status_url=f"/jobs/{job['job_id']}"))
+    response.headers["Location"] = f"/jobs/{job['job_id']}"
+    return response, 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Stream a job's status as Server-Sent Events until it finishes."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    
+    def generate():
+        status = None
+        while True:
+            job = job_queue.wait(job_id, JOB_HEARTBEAT)
+            if job is None:
+                yield sse_event("error", {"error": f"Job '{job_id}' expired."})
+                return
+            if job["status"] in JOB_FINISHED:
+                yield sse_event(job["status"], job)
+                return
+            if job["status"] != status:
+                status = job["status"]
+                yield sse_event("status", job)
+            else:
+                yield ": keep-alive\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/get-syllabus-info", methods=["GET"])
 def get_syllabus_info():
-    global syllabus_data, CO_TO_UNIT_MAP
     
-    if not syllabus_data:
+    syllabus_id = request.args.get("syllabus_id")
+    syllabus = resolve_syllabus(syllabus_id)
+    if not syllabus:
         return jsonify({"message": "No syllabus loaded"}), 404
     
+    return send_payload(syllabus_payload(syllabus, "info", lambda: build_syllabus_info(syllabus)))
+
+def build_syllabus_info(syllabus):
+    syllabus_data = syllabus["syllabus_data"]
     course_info = syllabus_data.get("course_metadata", {})
     
     response = {
+        "syllabus_id": syllabus["syllabus_id"],
         "course_code": course_info.get("course_code"),
         "course_name": course_info.get("course_name"),
         "department": course_info.get("department"),
         "semester": course_info.get("semester"),
         "total_units": syllabus_data.get("syllabus_structure", {}).get("total_units", 0),
-        "available_cos": list(CO_TO_UNIT_MAP.keys()),
+        "available_cos": syllabus["model"].available_cos,
         "units": []
     }
     units = syllabus_data.get("syllabus_structure", {}).get("units", [])
@@ -624,39 +3977,147 @@ def get_syllabus_info():
             "periods": unit.get("periods")
         })
     
-    return jsonify(response)
+    return response
+
+@app.route("/get-syllabus-details", methods=["GET"])
+def get_syllabus_details():
+    """Return the secondary sections (references, CO/PO/PSO mapping, assessment).
+
+    These are parsed on first request; ``?section=`` limits the response to one.
+    """
+    syllabus_id = request.args.get("syllabus_id")
+    syllabus = resolve_syllabus(syllabus_id)
+    if not syllabus:
+        return jsonify({"message": "No syllabus loaded"}), 404
+    
+    section = request.args.get("section")
+    if section and section not in LAZY_SECTIONS:
+        return jsonify({
+            "error": f"Unknown section '{section}'.",
+            "available_sections": list(LAZY_SECTIONS)
+        }), 400
+    
+    def build():
+        syllabus_data = syllabus["syllabus_data"]
+        response = {"syllabus_id": syllabus["syllabus_id"]}
+        for name in [section] if section else LAZY_SECTIONS:
+            response[name] = syllabus_data.get(name)
+        return response
+    
+    return send_payload(syllabus_payload(syllabus, f"details:{section or ''}", build))
 
 @app.route("/get-co-topics/<co_code>", methods=["GET"])
 def get_co_topics(co_code):
    
-    global CO_TO_UNIT_MAP
-    
-    if not syllabus_data:
+    syllabus_id = request.args.get("syllabus_id")
+    syllabus = resolve_syllabus(syllabus_id)
+    if not syllabus:
         return jsonify({"error": "No syllabus loaded"}), 404
     
+    model = syllabus["model"]
     co_code = co_code.upper()
     
-    if co_code not in CO_TO_UNIT_MAP:
-        available_cos = list(CO_TO_UNIT_MAP.keys())
+    unit = model.unit_for(co_code)
+    if unit is None:
         return jsonify({
             "error": f"CO '{co_code}' not found.",
-            "available_cos": available_cos
+            "available_cos": model.available_cos
         }), 404
     
-    co_info = CO_TO_UNIT_MAP[co_code]
+    return send_payload(syllabus_payload(syllabus, f"co-topics:{co_code}", lambda: {
+        "syllabus_id": syllabus["syllabus_id"],
+        "course_outcome": co_code,
+        "unit_id": unit.unit_id,
+        "unit_title": unit.title,
+        "topics": unit.topics,
+        "periods": unit.periods
+    }))
+
+@app.route("/warmup", methods=["POST"])
+def request_warmup():
+    """Queue background generation of the default question pools for a syllabus's COs.
+
+    Runs whether or not ``WARMUP_ENABLED`` is set; ``course_outcomes``
+    limits it to some COs.
+    """
+    data = request.get_json(silent=True) or {}
+    syllabus_id = data.get("syllabus_id")
+    syllabus = resolve_syllabus(syllabus_id)
+    if not syllabus:
+        return syllabus_not_found(syllabus_id)
+    
+    available = syllabus["model"].available_cos
+    co_codes = [str(code).upper() for code in data.get("course_outcomes") or available]
+    unknown = [code for code in co_codes if code not in available]
+    if unknown:
+        return jsonify({"error": f"Unknown course outcomes: {', '.join(unknown)}", "available_cos": available}), 404
     
+    warmup_scheduler.schedule(syllabus["syllabus_id"], co_codes)
     return jsonify({
-        "course_outcome": co_code,
-        "unit_id": co_info["unit_id"],
-        "unit_title": co_info["unit_title"],
-        "topics": co_info["full_unit"].get("topics", {}),
-        "periods": co_info["full_unit"].get("periods")
+        "syllabus_id": syllabus["syllabus_id"],
+        "course_outcomes": co_codes,
+        "sections": warmup_sections,
+        "warmup": warmup_scheduler.stats()
+    }), 202
+
+@app.route("/question-bank", methods=["GET"])
+def list_question_bank():
+    """List banked questions for a syllabus, filtered by ``course_outcome``, ``marks`` and ``bloom_level``."""
+    syllabus_id = request.args.get("syllabus_id")
+    syllabus = resolve_syllabus(syllabus_id)
+    if not syllabus:
+        return jsonify({"error": "No syllabus loaded"}), 404
+    
+    co_code = request.args.get("course_outcome")
+    marks = request.args.get("marks", type=int)
+    bloom_level = request.args.get("bloom_level")
+    limit = min(request.args.get("limit", 100, type=int), 1000)
+    
+    return jsonify({
+        "syllabus_id": syllabus["syllabus_id"],
+        "questions": question_bank.list(
+            syllabus["syllabus_id"],
+            co_code.upper() if co_code else None,
+            marks,
+            normalize_bloom_tag(bloom_level) if bloom_level else None,
+            limit
+        )
+    })
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    lines = []
+    for metric in metrics_registry:
+        lines.extend(metric.render())
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+@app.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify({
+        "generation": generation_cache.stats(),
+        "in_flight": generation_flights.stats(),
+        "jobs": job_queue.stats(),
+        "question_bank": question_bank.stats(),
+        "warmup": warmup_scheduler.stats(),
+        "backends": backend_router.stats(),
+        "syllabi": len(syllabus_store)
     })
 
+@app.cli.command("ingest")
+@click.argument("path", type=click.Path(exists=True))
+def ingest_command(path):
+    """Parse every PDF in a directory or zip archive into the parse cache, printing NDJSON progress."""
+    if os.path.isdir(path):
+        pdfs = iter_directory_pdfs(path)
+    else:
+        pdfs = iter_zip_pdfs(path)
+    for event in ingest_pdfs(pdfs):
+        click.echo(json.dumps(event))
+
 if __name__ == "__main__":
    
     if not os.getenv("HF_TOKEN"):
         print("Warning: HF_TOKEN not found in environment variables.")
         print("Please set HF_TOKEN in your .env file or environment.")
     
-    app.run(debug=True, port=5000)
+    app.run(debug=os.getenv("FLASK_DEBUG", "1") == "1", port=int(os.getenv("PORT", "5000")))
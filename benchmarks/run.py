@@ -0,0 +1,259 @@
+"""Benchmark syllabus parsing, /upload-pdf and /ask-question, and print the results as JSON.
+
+    python -m benchmarks.run --requests 200 --concurrency 16 --output results.json
+
+The app is served on a local port and talks to the stub model server from
+``benchmarks.stub_llm``, so runs are reproducible and never leave the machine.
+Persistent caches are disabled so every run starts cold.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.stub_llm import start_stub_server
+from benchmarks.syllabus_pdf import generate_syllabus_pdf
+
+PARSE_SIZES = [
+    {"units": 5, "topics": 6, "pages": None},
+    {"units": 10, "topics": 12, "pages": 20},
+    {"units": 20, "topics": 30, "pages": 60},
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed=None, errors=0):
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "mean_ms": round(1000 * sum(values) / len(values), 3) if values else None,
+        "p50_ms": round(1000 * percentile(values, 0.50), 3) if values else None,
+        "p90_ms": round(1000 * percentile(values, 0.90), 3) if values else None,
+        "p99_ms": round(1000 * percentile(values, 0.99), 3) if values else None,
+        "max_ms": round(1000 * values[-1], 3) if values else None,
+    }
+    if elapsed:
+        summary["throughput_per_s"] = round(len(values) / elapsed, 3)
+    return summary
+
+
+def bench_parse(app, iterations):
+    results = []
+    for size in PARSE_SIZES:
+        pdf = generate_syllabus_pdf(size["units"], size["topics"], size["pages"])
+        text = app.extract_text_from_pdf(io.BytesIO(pdf))
+        page_count = len(app.PdfReader(io.BytesIO(pdf)).pages)
+        
+        extract = []
+        parse = []
+        parse_memo = []
+        parse_full = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            app.extract_text_from_pdf(io.BytesIO(pdf))
+            extract.append(time.perf_counter() - started)
+            # "parse" is always cold so it stays comparable across commits;
+            # "parse_memo" re-parses the same text with the unit memo warm, as
+            # for a revised upload whose units did not change.
+            app.parse_unit_block.cache_clear()
+            started = time.perf_counter()
+            syllabus_data = app.parse_syllabus(text)
+            parse.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            app.parse_syllabus(text)
+            parse_memo.append(time.perf_counter() - started)
+            # Secondary sections are parsed lazily; time them separately.
+            started = time.perf_counter()
+            syllabus_data.resolve_all()
+            parse_full.append(parse[-1] + time.perf_counter() - started)
+        
+        results.append(dict(
+            size,
+            pages=page_count,
+            pdf_bytes=len(pdf),
+            text_chars=len(text),
+            extract=dict(summarize(extract), pages_per_s=round(page_count * len(extract) / sum(extract), 1)),
+            parse=dict(summarize(parse), parses_per_s=round(len(parse) / sum(parse), 1)),
+            parse_memo=dict(summarize(parse_memo), parses_per_s=round(len(parse_memo) / sum(parse_memo), 1)),
+            parse_full=dict(summarize(parse_full), parses_per_s=round(len(parse_full) / sum(parse_full), 1))
+        ))
+    return results
+
+
+_sessions = threading.local()
+
+
+def session():
+    """One keep-alive session per load-generating thread."""
+    if not hasattr(_sessions, "session"):
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+
+def run_load(send, total, concurrency):
+    """Call ``send(i)`` ``total`` times from ``concurrency`` threads; ``send`` returns True on success."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    
+    def one(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = send(i)
+        except requests.exceptions.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    return dict(summarize(latencies, time.perf_counter() - started, errors), concurrency=concurrency)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def serve_app(app):
+    server = make_server("127.0.0.1", 0, app.app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def bench_upload(base_url, total, concurrency):
+    # Every upload is a different PDF so each one is parsed from scratch.
+    pdfs = [generate_syllabus_pdf(seed=i) for i in range(total)]
+    
+    def send(i):
+        response = session().post(f"{base_url}/upload-pdf", files={"file": (f"syllabus-{i}.pdf", pdfs[i])})
+        return response.status_code == 200
+    
+    return run_load(send, total, concurrency)
+
+
+def bench_ask(base_url, total, concurrency, cached):
+    upload = session().post(f"{base_url}/upload-pdf", files={"file": ("syllabus.pdf", generate_syllabus_pdf())})
+    upload.raise_for_status()
+    syllabus = upload.json()
+    course_outcomes = syllabus["available_cos"]
+    
+    def send(i):
+        response = session().post(f"{base_url}/ask-question", json={
+            "syllabus_id": syllabus["syllabus_id"],
+            "course_outcome": course_outcomes[i % len(course_outcomes)],
+            "prompt": "Generate 5 2-mark questions" if cached else f"Generate 5 2-mark questions (run {i})",
+            "cache": None if cached else "bypass"
+        })
+        return response.status_code == 200 and not response.json()["answer"].startswith("Error")
+    
+    if cached:
+        for i in range(len(course_outcomes)):
+            send(i)
+    return run_load(send, total, concurrency)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint benchmark")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=20, help="repetitions per parse size")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model latency in seconds")
+    parser.add_argument("--tokens", type=int, default=200, help="stub completion tokens per answer")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="stub tokens per second; 0 is instant")
+    parser.add_argument("--backends", type=int, default=1, help="stub backends to route over (LLM_BACKENDS)")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="share of stub requests that stall")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="seconds a stalled stub request waits")
+    parser.add_argument("--only", choices=["parse", "upload", "ask"], action="append",
+                        help="run only these benchmarks (repeatable)")
+    parser.add_argument("--output", default="-", help="file to write the JSON results to")
+    args = parser.parse_args()
+    selected = set(args.only or ["parse", "upload", "ask"])
+    
+    stubs = [
+        start_stub_server(args.latency, args.tokens, args.token_rate,
+                          slow_fraction=args.slow_fraction, slow_latency=args.slow_latency)
+        for _ in range(max(1, args.backends))
+    ]
+    os.environ.update({
+        "HF_API_URL": stubs[0].url,
+        "HF_TOKEN": os.getenv("HF_TOKEN", "benchmark"),
+        "PARSE_CACHE_PATH": "",
+        "GENERATION_CACHE_PATH": "",
+        "QUESTION_BANK_PATH": "",
+        "SYLLABUS_BACKEND": "memory",
+    })
+    if len(stubs) > 1:
+        os.environ["LLM_BACKENDS"] = json.dumps([
+            {"name": f"stub-{index}", "url": stub.url} for index, stub in enumerate(stubs)
+        ])
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app
+    
+    results = {}
+    if "parse" in selected:
+        results["parse"] = bench_parse(app, args.iterations)
+    if selected & {"upload", "ask"}:
+        server, base_url = serve_app(app)
+        if "upload" in selected:
+            results["upload_pdf"] = bench_upload(base_url, args.requests, args.concurrency)
+        if "ask" in selected:
+            results["ask_question"] = bench_ask(base_url, args.requests, args.concurrency, cached=False)
+            results["ask_question_cached"] = bench_ask(base_url, args.requests, args.concurrency, cached=True)
+        server.shutdown()
+    results["stub_requests"] = sum(stub.requests for stub in stubs)
+    
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    for stub in stubs:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
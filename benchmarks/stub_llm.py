@@ -0,0 +1,132 @@
+"""A local OpenAI-compatible chat completions server that stands in for the model API.
+
+    python -m benchmarks.stub_llm --port 8800 --latency 0.5 --tokens 200 --token-rate 100
+
+Point the app at it with ``HF_API_URL=http://127.0.0.1:8800/v1/chat/completions``,
+or list several stubs in ``LLM_BACKENDS``. ``--slow-fraction`` and
+``--slow-latency`` make a share of the requests stall, to exercise hedging.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOOM_LEVELS = ["Remember", "Understand", "Apply", "Analyze", "Evaluate", "Create"]
+
+
+def fake_tokens(count):
+    """Yield ``count`` text chunks shaped like a question list."""
+    yield "2-MARK QUESTIONS:\n"
+    emitted = 1
+    number = 1
+    while emitted < count:
+        yield f"{number}. Explain"
+        emitted += 1
+        for _ in range(min(8, count - emitted)):
+            yield " topic"
+            emitted += 1
+        if emitted < count:
+            yield f"? [{BLOOM_LEVELS[number % len(BLOOM_LEVELS)]}]\n"
+            emitted += 1
+        number += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+        
+        slow = config["slow_fraction"] > 0 and random.random() < config["slow_fraction"]
+        time.sleep(config["slow_latency"] if slow else config["latency"])
+        tokens = list(fake_tokens(config["tokens"]))
+        interval = 1.0 / config["token_rate"] if config["token_rate"] > 0 else 0.0
+        usage = {"prompt_tokens": sum(len(m.get("content", "")) // 4 for m in body.get("messages", [])),
+                 "completion_tokens": len(tokens)}
+        
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                self.write_chunk({"choices": [{"index": 0, "delta": {"content": token}}]})
+                time.sleep(interval)
+            self.write_chunk({"choices": [], "usage": usage})
+            self.write_chunk("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        
+        time.sleep(interval * len(tokens))
+        payload = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": "stop"}],
+            "usage": usage
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def write_chunk(self, data):
+        line = data if isinstance(data, str) else json.dumps(data)
+        event = f"data: {line}\n\n".encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+        self.wfile.flush()
+
+
+def start_stub_server(latency=0.5, tokens=200, token_rate=0.0, host="127.0.0.1", port=0,
+                      slow_fraction=0.0, slow_latency=5.0):
+    """Serve the stub on a background thread; returns the server (see ``server.url``)."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = {
+        "latency": latency,
+        "tokens": tokens,
+        "token_rate": token_rate,
+        "slow_fraction": slow_fraction,
+        "slow_latency": slow_latency
+    }
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.url = f"http://{host}:{server.server_port}/v1/chat/completions"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tokens", type=int, default=200, help="completion tokens per answer")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="tokens per second; 0 sends them at once")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="share of requests that stall")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="seconds a stalled request waits")
+    args = parser.parse_args()
+    
+    server = start_stub_server(args.latency, args.tokens, args.token_rate, args.host, args.port,
+                               args.slow_fraction, args.slow_latency)
+    print(f"Stub model API listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
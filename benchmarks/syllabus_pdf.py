@@ -0,0 +1,153 @@
+"""Generate synthetic syllabus PDFs in the layout the parsers in app.py expect.
+
+    python -m benchmarks.syllabus_pdf -o syllabus.pdf --units 5 --topics 6 --pages 4
+"""
+import argparse
+import random
+
+ROMAN = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X",
+         "XI", "XII", "XIII", "XIV", "XV", "XVI", "XVII", "XVIII", "XIX", "XX"]
+WORDS = [
+    "process", "thread", "memory", "paging", "scheduling", "deadlock", "file", "system",
+    "network", "protocol", "cache", "storage", "kernel", "security", "queue", "graph",
+    "tree", "search", "sorting", "hashing", "compiler", "parser", "model", "design",
+    "analysis", "testing", "database", "index", "transaction", "recovery", "signal", "device"
+]
+BLOOMS = ["K1", "K2", "K3", "K4", "K5", "K6"]
+LINES_PER_PAGE = 60
+
+
+def phrase(rng, words=2):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).title()
+
+
+def build_syllabus_lines(units=5, topics=6, subtopics=4, seed=0):
+    """Return the text lines of a syllabus with ``units`` units of ``topics`` topics each."""
+    rng = random.Random(seed)
+    units = max(1, min(units, len(ROMAN)))
+    
+    lines = [
+        "Department Computer Science and Engineering Programme: B.Tech",
+        "Semester V",
+        f"Course Code CS{300 + seed % 700}",
+        f"Course Name {phrase(rng, 3)} 3 0 0 3",
+        "Periods/Week L T P C Maximum Marks",
+        "3 0 0 3 CAM ESE TM",
+        "x 25 75 100",
+        "Prerequisite Data Structures",
+        "Course Outcomes",
+    ]
+    for number in range(1, units + 1):
+        lines.append(f"CO{number} Explain {phrase(rng).lower()} concepts {rng.choice(BLOOMS)}")
+    
+    for number in range(1, units + 1):
+        lines.append(f"UNIT - {ROMAN[number - 1]} {phrase(rng)} Periods: 9")
+        for topic in range(topics):
+            subtopic_text = " - ".join(phrase(rng) for _ in range(subtopics))
+            suffix = f" CO{number}" if topic == 0 else ""
+            lines.append(f"{phrase(rng).upper()} {topic + 1}: {subtopic_text}{suffix}")
+    
+    lines += [
+        f"Lecture Periods: {9 * units} Tutorial Periods: - Practical Periods: - Total Periods: {9 * units}",
+        "Text Books",
+        f"1. {phrase(rng, 3)}, {phrase(rng)} Press",
+        "Reference Books",
+        f"1. {phrase(rng, 3)}, {phrase(rng)} Press",
+        "Web References",
+        "1. https://example.com/course",
+        "COs/POs/PSOs Mapping",
+    ]
+    for number in range(1, units + 1):
+        values = [rng.choice(["1", "2", "3", "-"]) for _ in range(15)]
+        lines.append(f"{number} " + " ".join(values))
+    lines += ASSESSMENT_LINES
+    return lines
+
+
+ASSESSMENT_LINES = [
+    "",
+    "Correlation Level 1 - Low, 2 - Medium, 3 - High",
+    "Assessment",
+    "Continuous Assessment Marks",
+    "Theory",
+    "CAT1 CAT2 Assignment",
+    "Marks",
+    "15 15 10 Total Marks 40",
+]
+
+
+def paginate(lines, pages=None):
+    """Split lines over ``pages`` pages (at least as many as the text needs).
+
+    The assessment block is positional, so it always stays on the last page.
+    """
+    tail = len(ASSESSMENT_LINES) if lines[-len(ASSESSMENT_LINES):] == ASSESSMENT_LINES else 0
+    body = lines[:len(lines) - tail]
+    needed = -(-len(lines) // LINES_PER_PAGE)
+    pages = max(pages or needed, needed, 1)
+    per_page = -(-len(body) // pages) if body else 0
+    chunks = [body[i * per_page:(i + 1) * per_page] for i in range(pages)]
+    chunks[-1] = chunks[-1] + lines[len(body):]
+    return [chunk or [" "] for chunk in chunks]
+
+
+def write_pdf(pages):
+    """Render a list of pages (each a list of text lines) as a minimal PDF."""
+    objects = []
+    
+    def add(body):
+        objects.append(body)
+        return len(objects)
+    
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 2 * len(pages) + 1
+    page_ids = []
+    for lines in pages:
+        operations = ["BT /F1 10 Tf 12 TL 40 800 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            operations.append(f"({escaped}) Tj T*")
+        operations.append("ET")
+        stream = "\n".join(operations).encode("latin-1", "replace")
+        contents = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, contents, font)
+        ))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    add(b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return output
+
+
+def generate_syllabus_pdf(units=5, topics=6, pages=None, subtopics=4, seed=0):
+    return write_pdf(paginate(build_syllabus_lines(units, topics, subtopics, seed), pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--units", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=6, help="topics per unit")
+    parser.add_argument("--subtopics", type=int, default=4, help="subtopics per topic")
+    parser.add_argument("--pages", type=int, default=None, help="spread the text over this many pages")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    with open(args.output, "wb") as f:
+        f.write(generate_syllabus_pdf(args.units, args.topics, args.pages, args.subtopics, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Model calls and streamed answers can run well past gunicorn's 30s default.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Each worker imports app.py itself so SQLite connections, HTTP pools and the
+# PDF extraction pool are never shared across a fork.
+preload_app = False
+
+# Every worker starts its own extraction pool on its first long PDF. The
+# app defaults to one process per CPU, which across all workers would be
+# about workers x CPUs processes, so split the CPUs between the workers
+# instead (workers inherit this environment). With the default worker count
+# that leaves 1, which means each worker extracts in-process and starts no
+# pool at all.
+os.environ.setdefault("PDF_EXTRACT_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = os.getenv("GUNICORN_ERRORLOG", "-")
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
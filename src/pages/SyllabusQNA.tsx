@@ -9,6 +9,7 @@ interface CourseInfo {
 
 interface UploadResponse {
   message: string;
+  syllabus_id: string;
   available_cos: string[];
   course_info: CourseInfo;
 }
@@ -94,7 +95,11 @@ const SyllabusQnA: React.FC = () => {
     setError('');
 
     try {
-      const response = await fetch(`${API_BASE_URL}/get-co-topics/${selectedCO}`);
+      const params = new URLSearchParams();
+      if (uploadResponse?.syllabus_id) {
+        params.set('syllabus_id', uploadResponse.syllabus_id);
+      }
+      const response = await fetch(`${API_BASE_URL}/get-co-topics/${selectedCO}?${params}`);
 
       if (!response.ok) {
         throw new Error('Failed to fetch topics');
@@ -117,25 +122,61 @@ const SyllabusQnA: React.FC = () => {
 
     setLoading(true);
     setError('');
+    setQuestionResponse(null);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/ask-question`, {
+      const response = await fetch(`${API_BASE_URL}/ask-question/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
+          syllabus_id: uploadResponse?.syllabus_id,
           course_outcome: selectedCO,
           prompt: prompt,
         }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error('Failed to generate questions');
       }
 
-      const data: QuestionResponse = await response.json();
-      setQuestionResponse(data);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let answer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+          break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() ?? '';
+
+        for (const rawEvent of events) {
+          const lines = rawEvent.split('\n');
+          const eventName = lines.find(line => line.startsWith('event:'))?.slice(6).trim();
+          const data = lines.filter(line => line.startsWith('data:')).map(line => line.slice(5).trim()).join('\n');
+          if (!eventName || !data) {
+            continue;
+          }
+          const payload = JSON.parse(data);
+
+          if (eventName === 'start') {
+            setQuestionResponse({ ...payload, answer: '' });
+          } else if (eventName === 'token') {
+            answer += payload.text;
+            const partialAnswer = answer;
+            setQuestionResponse(current => (current ? { ...current, answer: partialAnswer } : current));
+          } else if (eventName === 'end') {
+            setQuestionResponse(payload as QuestionResponse);
+          } else if (eventName === 'error') {
+            throw new Error(payload.error);
+          }
+        }
+      }
     } catch (err) {
       setError('Failed to generate questions. Please try again.');
     } finally {
@@ -784,9 +825,9 @@ const SyllabusQnA: React.FC = () => {
             {loading ? 'Generating...' : 'Generate Questions'}
           </button>
 
-          {loading && <div className="loading">Generating questions</div>}
+          {loading && !questionResponse && <div className="loading">Generating questions</div>}
 
-          {questionResponse && !loading && (
+          {questionResponse && (
             <div className="questions-display">
               <div className="questions-header">
                 <h3>{questionResponse.course_outcome} - {questionResponse.unit}</h3>
@@ -0,0 +1,301 @@
+"""The syllabus parsers as they were before the linear-time rewrite, kept as a differential oracle.
+
+Copied verbatim from the original app.py; do not "fix" them.
+"""
+import re
+
+def parse_course_metadata(text):
+
+    metadata = {}
+    
+    course_name_match = re.search(r"Course Name\s+(.*?)\s+(?=\d|$)", text, re.I | re.S)
+    if course_name_match:
+        metadata["course_name"] = course_name_match.group(1).strip()
+    
+    course_code_match = re.search(r"Course Code\s+(\S+)", text)
+    if course_code_match:
+        metadata["course_code"] = course_code_match.group(1)
+    
+    semester_match = re.search(r"Semester\s+([IVX\d]+)", text)
+    if semester_match:
+        metadata["semester"] = semester_match.group(1)
+    
+    dept_match = re.search(r"Department\s+(.*?)\s+(?=Programme:|Course Code:|$)", text, re.I | re.S)
+    if dept_match:
+        metadata["department"] = dept_match.group(1).strip()
+    
+    programme_match = re.search(r"Programme[:\s]+(.*?)\s+(?=Semester|Course Code:|$)", text, re.I | re.S)
+    if programme_match:
+        metadata["programme"] = programme_match.group(1).strip()
+    
+    periods_match = re.search(r"Periods/Week\s+L\s+T\s+P\s+C\s+.*?\n\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)", text)
+    if periods_match:
+        metadata["periods"] = {
+            "lecture": int(periods_match.group(1)),
+            "tutorial": int(periods_match.group(2)),
+            "practical": int(periods_match.group(3)),
+            "credits": int(periods_match.group(4))
+        }
+    
+    marks_match = re.search(r"Maximum Marks.*?\n.*?\n.*?\s+(\d+)\s+(\d+)\s+(\d+)", text, re.S)
+    if marks_match:
+        metadata["marks_distribution"] = {
+            "continuous_assessment": int(marks_match.group(1)),
+            "end_semester_exam": int(marks_match.group(2)),
+            "total_marks": int(marks_match.group(3))
+        }
+    
+    prereq_match = re.search(r"Prerequisite\s+(.*?)\s+(?=Course Outcomes|On completion)", text, re.I | re.S)
+    if prereq_match:
+        metadata["prerequisite"] = prereq_match.group(1).strip()
+    
+    co_pattern = re.compile(r"(CO\d+)\s+(.*?)\s+(K\d+)", re.S)
+    course_outcomes = []
+    
+    co_section_start = text.find("Course Outcomes")
+    if co_section_start != -1:
+        co_section = text[co_section_start:]
+        co_end = co_section.find("UNIT")
+        if co_end != -1:
+            co_section = co_section[:co_end]
+        
+        for match in co_pattern.finditer(co_section):
+            course_outcomes.append({
+                "code": match.group(1),
+                "description": match.group(2).strip(),
+                "blooms_level": match.group(3)
+            })
+    
+    metadata["course_outcomes"] = course_outcomes
+    
+    return metadata
+
+def parse_units(text):
+    unit_pattern = re.compile(
+        r"(UNIT\s*[-–\s]*[IVX\d]+)\s+(.*?)\s+Periods\s*[:–]\s*(\d+)(.*?)(?=UNIT\s*[-–\s]*[IVX\d]+|COs/POs/PSOs Mapping|Text Books|Reference Books|Web References|Lecture Periods|\Z)",
+        re.S | re.I
+    )
+    
+    units = []
+    
+    for match in unit_pattern.finditer(text):
+        unit_id = match.group(1).strip()
+        title = match.group(2).strip()
+        periods = int(match.group(3))
+        content = match.group(4).strip()
+        
+        content = re.sub(r'Lecture Periods.*?Total Periods:\d+', '', content, flags=re.S | re.I)
+        
+        topics = {}
+        
+        blocks = re.split(r'\n(?=[A-Z][^a-z]*:)', content)
+        
+        for block in blocks:
+            block = block.strip()
+            if ':' in block:
+                parts = block.split(':', 1)
+                if len(parts) == 2:
+                    heading = parts[0].strip()
+                    content_text = parts[1].strip()
+                    
+                    content_text = re.sub(r'\bCO\d+\b', '', content_text).strip()
+                    
+                    topic_list = []
+                    for topic in re.split(r'[–—\-•\n.]+', content_text):
+                        topic = topic.strip()
+                        if topic and len(topic) > 1:
+                            topic = re.sub(r'[,.:;]+$', '', topic)
+                            if topic:
+                                topic_list.append(topic)
+                    
+                    if topic_list:
+                        topics[heading] = topic_list
+        
+        co_match = re.search(r'\b(CO\d+)\b', content)
+        co = co_match.group(1) if co_match else None
+        
+        units.append({
+            "unit_id": unit_id,
+            "title": title,
+            "periods": periods,
+            "topics": topics,
+            "course_outcome": co
+        })
+    
+    return units
+
+def parse_total_periods(text):
+
+    periods_info = {}
+    
+    lecture_match = re.search(r'Lecture Periods\s*[:–]\s*(\d+)', text, re.I)
+    tutorial_match = re.search(r'Tutorial Periods\s*[:–]\s*(\d+|[-–])', text, re.I)
+    practical_match = re.search(r'Practical Periods\s*[:–]\s*(\d+|[-–])', text, re.I)
+    total_match = re.search(r'Total Periods\s*[:–]\s*(\d+)', text, re.I)
+    
+    if lecture_match:
+        periods_info["lecture_periods"] = int(lecture_match.group(1))
+    
+    if tutorial_match:
+        try:
+            periods_info["tutorial_periods"] = int(tutorial_match.group(1))
+        except ValueError:
+            periods_info["tutorial_periods"] = 0
+    
+    if practical_match:
+        try:
+            periods_info["practical_periods"] = int(practical_match.group(1))
+        except ValueError:
+            periods_info["practical_periods"] = 0
+    
+    if total_match:
+        periods_info["total_periods"] = int(total_match.group(1))
+    
+    return periods_info if periods_info else None
+
+def parse_references(text):
+    references = {
+        "text_books": [],
+        "reference_books": [],
+        "web_references": []
+    }
+    
+    tb_start = text.find("Text Books")
+    rb_start = text.find("Reference Books")
+    wr_start = text.find("Web References")
+    
+    if tb_start != -1:
+        tb_end = rb_start if rb_start != -1 else wr_start if wr_start != -1 else len(text)
+        tb_section = text[tb_start:tb_end]
+        
+        tb_items = re.findall(r'\d+\.\s+(.*?)(?=\d+\.|$)', tb_section, re.S)
+        for item in tb_items:
+            if item.strip():
+                item = re.sub(r'\s*\n\s*', ' ', item.strip())
+                references["text_books"].append(item)
+    
+    if rb_start != -1:
+        rb_end = wr_start if wr_start != -1 else len(text)
+        rb_section = text[rb_start:rb_end]
+        
+        rb_items = re.findall(r'\d+\.\s+(.*?)(?=\d+\.|$)', rb_section, re.S)
+        for item in rb_items:
+            if item.strip():
+                item = re.sub(r'\s*\n\s*', ' ', item.strip())
+                references["reference_books"].append(item)
+    
+    if wr_start != -1:
+        wr_section = text[wr_start:]
+        
+        urls = re.findall(r'https?://[^\s]+', wr_section)
+        for url in urls:
+            references["web_references"].append(url.strip())
+        
+        wr_items = re.findall(r'\d+\.\s+(.*?)(?=\d+\.|$)', wr_section, re.S)
+        for item in wr_items:
+            item = item.strip()
+            if item and item not in references["web_references"] and not item.startswith("http"):
+                item = re.sub(r'\s*\n\s*', ' ', item)
+                references["web_references"].append(item)
+    
+    return references
+
+def parse_co_po_pso_table(text):
+
+    table_start = text.find("COs/POs/PSOs Mapping")
+    if table_start == -1:
+        return None
+    
+    table_section = text[table_start:]
+    
+    next_section = re.search(r'\n\s*\n\s*[A-Z]', table_section)
+    if next_section:
+        table_section = table_section[:next_section.start()]
+    
+    rows = []
+    lines = table_section.split('\n')
+    
+    for line in lines:
+        line = line.strip()
+        if re.match(r'^\d\s+', line):
+            parts = line.split()
+            if len(parts) >= 1:
+                co_num = parts[0]
+                mapping_values = []
+                for val in parts[1:]:
+                    if val == '-':
+                        mapping_values.append(None)
+                    elif val.isdigit():
+                        mapping_values.append(int(val))
+                    else:
+                        mapping_values.append(None)
+                
+                po_mapping = {}
+                pso_mapping = {}
+                
+                for i in range(12):
+                    po_key = f"PO{i+1}"
+                    po_value = mapping_values[i] if i < len(mapping_values) else None
+                    po_mapping[po_key] = po_value
+                
+                for i in range(3):
+                    pso_key = f"PSO{i+1}"
+                    pso_index = 12 + i
+                    pso_value = mapping_values[pso_index] if pso_index < len(mapping_values) else None
+                    pso_mapping[pso_key] = pso_value
+                
+                rows.append({
+                    "CO": f"CO{co_num}",
+                    "POs": po_mapping,
+                    "PSOs": pso_mapping
+                })
+    
+    if not rows:
+        return None
+    
+    return {
+        "correlation_scale": {
+            "1": "Low",
+            "2": "Medium",
+            "3": "High"
+        },
+        "mapping": rows
+    }
+
+def parse_assessment_details(text):
+
+    assessment = {}
+    
+    assessment_section_start = text.find("Correlation Level")
+    if assessment_section_start == -1:
+        return None
+    
+    assessment_section = text[assessment_section_start:]
+    
+    assessment_match = re.search(
+        r'Assessment\s*\n.*?\n.*?\n(.*?)\n.*?\n(.*?)(?=\n\s*\n|\Z)',
+        assessment_section,
+        re.S
+    )
+    
+    if assessment_match:
+        headers = re.findall(r'\b\w+\b', assessment_match.group(1))
+        values = re.findall(r'\b\d+\b', assessment_match.group(2))
+        
+        if headers and values:
+            components = []
+            for i, header in enumerate(headers):
+                if i < len(values):
+                    components.append({
+                        "component": header,
+                        "marks": int(values[i])
+                    })
+            
+            if components:
+                assessment["components"] = components
+                
+                total_match = re.search(r'Total Marks\s+(\d+)', assessment_match.group(2))
+                if total_match:
+                    assessment["total_marks"] = int(total_match.group(1))
+    
+    return assessment if assessment else None
@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# app.py reads its configuration at import time, so every on-disk store is
+# pointed at a throwaway directory before the first test imports it.
+STATE_DIR = tempfile.mkdtemp(prefix="question-bank-tests-")
+for name, filename in (
+    ("PARSE_CACHE_PATH", "parse_cache.sqlite3"),
+    ("SYLLABUS_STATE_PATH", "state.sqlite3"),
+    ("GENERATION_CACHE_PATH", "generation_cache.sqlite3"),
+    ("QUESTION_BANK_PATH", "question_bank.sqlite3"),
+):
+    os.environ.setdefault(name, os.path.join(STATE_DIR, filename))
+os.environ.setdefault("WARMUP_ENABLED", "0")
+os.environ.setdefault("HF_TOKEN", "test-token")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ANSWER = (
+    "2-MARK QUESTIONS:\n"
+    "1. Define a binary search tree. [Remember]\n"
+    "2. Explain the difference between a stack and a queue. [Understand]\n"
+)
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.requests.append({"client": self.client_address, "body": body, "at": time.monotonic()})
+            reply = server.script.popleft() if server.script else server.default
+        status, headers, content, delay = reply
+        time.sleep(delay)
+        
+        if content is None:
+            content = {"choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}}]}
+        payload = json.dumps(content).encode()
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class ScriptedUpstream(ThreadingHTTPServer):
+    """A chat completions endpoint that plays back queued replies, then a default one."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ScriptedHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.script = deque()
+        self.default = (200, {}, None, 0.0)
+        self.url = f"http://127.0.0.1:{self.server_port}/v1/chat/completions"
+
+    def reply(self, status=200, headers=None, content=None, delay=0.0):
+        """Queue one reply; ``content`` None sends a normal completion."""
+        self.script.append((status, headers or {}, content, delay))
+
+    def always(self, status=200, headers=None, content=None, delay=0.0):
+        self.default = (status, headers or {}, content, delay)
+
+    @property
+    def count(self):
+        with self.lock:
+            return len(self.requests)
+
+
+@pytest.fixture
+def upstream():
+    server = ScriptedUpstream()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_upstream():
+    servers = []
+    
+    def make():
+        server = ScriptedUpstream()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+    
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def client():
+    import app
+    
+    return app.app.test_client()
+
+
+@pytest.fixture(scope="session")
+def syllabus():
+    """Upload a synthetic syllabus once; returns the /upload-pdf response."""
+    import io
+
+    import app
+    from benchmarks.syllabus_pdf import generate_syllabus_pdf
+    
+    response = app.app.test_client().post(
+        "/upload-pdf?warmup=0",
+        data={"file": (io.BytesIO(generate_syllabus_pdf()), "syllabus.pdf")},
+        content_type="multipart/form-data"
+    )
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.fixture
+def route_to(monkeypatch):
+    """Send model calls to the given stub servers instead of the configured backends."""
+    import app
+    
+    def route(*servers, hedge=False):
+        backends = [app.LLMBackend(f"stub-{index}", server.url, "stub-model") for index, server in enumerate(servers)]
+        router = app.BackendRouter(backends, hedge, app.hedge_pool)
+        monkeypatch.setattr(app, "backend_router", router)
+        return router
+    
+    return route
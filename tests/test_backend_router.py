@@ -0,0 +1,139 @@
+"""BackendRouter weighting, failover and hedging against local stub servers."""
+import time
+from collections import Counter
+
+import pytest
+
+import app
+
+
+@pytest.fixture(autouse=True)
+def quick_hedges(monkeypatch):
+    monkeypatch.setattr(app, "HF_MAX_RETRIES", 0)
+    monkeypatch.setattr(app, "HEDGE_DEFAULT_DELAY", 0.2)
+    monkeypatch.setattr(app, "HEDGE_MIN_DELAY", 0.05)
+
+
+def backend(server, name, weight=1.0):
+    return app.LLMBackend(name, server.url, "stub-model", weight)
+
+
+def complete(router):
+    return router.complete(lambda chosen: (chosen.name, app.complete_with_backend(chosen, "prompt")))
+
+
+def test_choice_follows_weights_and_skips_open_breakers(make_upstream):
+    server = make_upstream()
+    heavy, light = backend(server, "heavy", 3), backend(server, "light", 1)
+    router = app.BackendRouter([heavy, light], hedge=False, pool=app.hedge_pool)
+    
+    picks = Counter(router.choose().name for _ in range(4000))
+    assert 0.7 < picks["heavy"] / 4000 < 0.8
+    
+    for _ in range(app.HF_BREAKER_THRESHOLD):
+        heavy.circuit.record_failure()
+    assert {router.choose().name for _ in range(200)} == {"light"}
+    assert router.choose(exclude=[light]) is heavy
+
+
+def test_failed_backend_fails_over(make_upstream):
+    broken, healthy = make_upstream(), make_upstream()
+    broken.always(400)
+    router = app.BackendRouter(
+        [backend(broken, "broken", 1e6), backend(healthy, "healthy", 1e-6)], hedge=False, pool=app.hedge_pool
+    )
+    
+    name, answer = complete(router)
+    
+    assert name == "healthy"
+    assert answer.startswith("2-MARK QUESTIONS")
+    assert (broken.count, healthy.count) == (1, 1)
+    assert router.backends[0].counters["failures"] == 1
+
+
+def test_every_backend_failing_raises_the_last_error(make_upstream):
+    servers = [make_upstream(), make_upstream()]
+    for server in servers:
+        server.always(400)
+    router = app.BackendRouter([backend(s, f"b{i}") for i, s in enumerate(servers)], hedge=False, pool=app.hedge_pool)
+    
+    with pytest.raises(app.requests.exceptions.HTTPError):
+        complete(router)
+    assert sum(server.count for server in servers) == 2
+
+
+def test_slow_call_is_hedged_and_the_fast_answer_wins(make_upstream):
+    slow, fast = make_upstream(), make_upstream()
+    slow.always(delay=1.5)
+    router = app.BackendRouter(
+        [backend(slow, "slow", 1e6), backend(fast, "fast", 1e-6)], hedge=True, pool=app.hedge_pool
+    )
+    
+    started = time.monotonic()
+    name, _ = complete(router)
+    
+    assert name == "fast"
+    assert time.monotonic() - started < 1.0
+    assert router.backends[0].counters["hedges"] == 0
+    assert router.backends[1].counters["hedges"] == 1
+    assert router.backends[1].counters["hedge_wins"] == 1
+
+
+def test_hedge_delay_follows_the_backend_p95(make_upstream, monkeypatch):
+    monkeypatch.setattr(app, "HEDGE_MIN_SAMPLES", 20)
+    chosen = backend(make_upstream(), "b")
+    router = app.BackendRouter([chosen], hedge=True, pool=app.hedge_pool)
+    
+    assert router.hedge_delay(chosen) == app.HEDGE_DEFAULT_DELAY
+    for i in range(100):
+        chosen.record(i / 100, True)
+    assert router.hedge_delay(chosen) == pytest.approx(0.95)
+
+
+def test_ask_question_is_served_through_the_router(client, make_upstream, route_to, syllabus):
+    broken, healthy = make_upstream(), make_upstream()
+    broken.always(503)
+    router = route_to(broken, healthy)
+    
+    response = client.post("/ask-question", json={
+        "syllabus_id": syllabus["syllabus_id"],
+        "course_outcome": syllabus["available_cos"][0],
+        "prompt": "Questions routed over two backends",
+        "cache": "bypass"
+    }).get_json()
+    
+    assert response["answer"].startswith("2-MARK QUESTIONS")
+    assert healthy.count == 1
+    assert sum(b["requests"] for b in router.stats()) == 1 + broken.count
+
+
+def test_time_queued_in_a_saturated_pool_does_not_trigger_a_hedge(make_upstream):
+    first, second = make_upstream(), make_upstream()
+    pool = app.ThreadPoolExecutor(max_workers=1)
+    router = app.BackendRouter([backend(first, "first"), backend(second, "second")], hedge=True, pool=pool)
+    # Keep the only pool thread busy for longer than the hedge delay.
+    pool.submit(time.sleep, 0.5)
+    
+    try:
+        complete(router)
+    finally:
+        pool.shutdown()
+    
+    assert first.count + second.count == 1
+    assert sum(b.counters["hedges"] for b in router.backends) == 0
+
+
+def test_call_that_never_leaves_the_pool_queue_fails(make_upstream, monkeypatch):
+    first, second = make_upstream(), make_upstream()
+    monkeypatch.setattr(app, "HF_READ_TIMEOUT", 0.1)
+    pool = app.ThreadPoolExecutor(max_workers=1)
+    router = app.BackendRouter([backend(first, "first"), backend(second, "second")], hedge=True, pool=pool)
+    pool.submit(time.sleep, 0.5)
+    
+    try:
+        with pytest.raises(app.CompletionError, match="free model call thread"):
+            complete(router)
+    finally:
+        pool.shutdown()
+    
+    assert first.count + second.count == 0
@@ -0,0 +1,104 @@
+"""Identical in-flight generations share one model call."""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+
+
+def ask_concurrently(syllabus, prompt, callers=8, cache=None):
+    barrier = threading.Barrier(callers)
+    # The generation cache outlives each test; a fresh prompt always reaches the model.
+    prompt = f"{prompt} ({uuid.uuid4().hex[:8]})"
+    
+    def ask(_):
+        barrier.wait()
+        return app.app.test_client().post("/ask-question", json={
+            "syllabus_id": syllabus["syllabus_id"],
+            "course_outcome": syllabus["available_cos"][0],
+            "prompt": prompt,
+            "cache": cache
+        }).get_json()
+    
+    with ThreadPoolExecutor(callers) as pool:
+        return list(pool.map(ask, range(callers)))
+
+
+def test_identical_requests_share_one_upstream_call(upstream, route_to, syllabus):
+    route_to(upstream)
+    upstream.always(delay=0.5)
+    
+    responses = ask_concurrently(syllabus, "Generate two short questions on trees")
+    
+    assert upstream.count == 1
+    assert len({response["answer"] for response in responses}) == 1
+    assert sum(not response["cached"] for response in responses) == 1
+
+
+def test_different_prompts_are_not_coalesced(upstream, route_to, syllabus):
+    route_to(upstream)
+    
+    for prompt in ("Questions on stacks", "Questions on queues"):
+        ask_concurrently(syllabus, prompt, callers=2)
+    
+    assert upstream.count == 2
+
+
+def test_cache_bypass_requests_are_not_coalesced(upstream, route_to, syllabus):
+    route_to(upstream)
+    upstream.always(delay=0.2)
+    
+    responses = ask_concurrently(syllabus, "Generate fresh questions on heaps", callers=4, cache="bypass")
+    
+    assert upstream.count == 4
+    assert not any(response["cached"] for response in responses)
+
+
+def test_upstream_error_reaches_every_waiter(upstream, route_to, syllabus):
+    route_to(upstream)
+    upstream.always(400, delay=0.5)
+    
+    responses = ask_concurrently(syllabus, "Generate questions that will fail")
+    
+    assert upstream.count == 1
+    assert all(response["answer"].startswith("Error") for response in responses)
+
+
+def test_follower_times_out_and_leader_error_propagates():
+    flights = app.SingleFlight(wait_timeout=0.1)
+    release = threading.Event()
+    
+    def slow():
+        release.wait(5)
+        raise app.CompletionError("upstream failed")
+    
+    outcome = []
+    
+    def lead():
+        try:
+            flights.do("key", slow)
+        except app.CompletionError as e:
+            outcome.append(e)
+    
+    leader = threading.Thread(target=lead)
+    leader.start()
+    while not flights.calls:
+        time.sleep(0.01)
+    
+    with pytest.raises(app.CompletionError, match="Timed out"):
+        flights.do("key", lambda: "never called")
+    
+    call, is_leader = flights.begin("key")
+    assert not is_leader
+    release.set()
+    leader.join()
+    assert len(outcome) == 1
+    with pytest.raises(app.CompletionError, match="upstream failed"):
+        call.wait(1)
+    
+    # Nothing is kept once the call completes.
+    assert flights.do("key", lambda: "fresh") == ("fresh", False)
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,30 @@
+"""The SQLite tier of the generation cache stays bounded."""
+import time
+
+import app
+
+
+def disk_keys(cache):
+    return {row[0] for row in cache._connect().execute("SELECT key FROM generation_cache")}
+
+
+def test_stores_drop_expired_rows(tmp_path):
+    cache = app.GenerationCache(str(tmp_path / "generation.sqlite3"), 8, 60, 100)
+    with cache._connect() as conn:
+        conn.execute(
+            "INSERT INTO generation_cache (key, answer, expires_at) VALUES ('stale', 'old', ?)",
+            (time.time() - 1,)
+        )
+    
+    cache.put("fresh", "new")
+    
+    assert disk_keys(cache) == {"fresh"}
+
+
+def test_disk_tier_keeps_the_newest_rows(tmp_path):
+    cache = app.GenerationCache(str(tmp_path / "generation.sqlite3"), 2, 60, 3)
+    for i in range(6):
+        cache.put(f"key-{i}", f"answer-{i}")
+    
+    assert disk_keys(cache) == {"key-3", "key-4", "key-5"}
+    assert app.GenerationCache(cache.path, 2, 60, 3).get("key-3") == "answer-3"
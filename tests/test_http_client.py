@@ -0,0 +1,124 @@
+"""post_with_retries and CircuitBreaker against a local stand-in for the model API."""
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+import app
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    # No jitter, so any delay observed comes from Retry-After.
+    monkeypatch.setattr(app, "HF_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(app, "HF_MAX_RETRIES", 3)
+
+
+def post(upstream, circuit=None):
+    return app.post_with_retries(upstream.url, {}, {"messages": []}, circuit=circuit or app.CircuitBreaker(5, 30))
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retryable_status_is_retried(upstream, status):
+    upstream.reply(status)
+    upstream.reply(status)
+    
+    response = post(upstream)
+    
+    assert response.status_code == 200
+    assert upstream.count == 3
+
+
+def test_client_error_is_not_retried(upstream):
+    upstream.reply(400)
+    
+    assert post(upstream).status_code == 400
+    assert upstream.count == 1
+
+
+def test_gives_up_after_max_retries(upstream, monkeypatch):
+    monkeypatch.setattr(app, "HF_MAX_RETRIES", 2)
+    upstream.always(503)
+    
+    assert post(upstream).status_code == 503
+    assert upstream.count == 3
+
+
+def test_retry_after_seconds_is_honoured(upstream):
+    upstream.reply(429, {"Retry-After": "1"})
+    
+    started = time.monotonic()
+    assert post(upstream).status_code == 200
+    
+    gap = upstream.requests[1]["at"] - upstream.requests[0]["at"]
+    assert 0.9 <= gap < 1.5
+    assert time.monotonic() - started < 2
+
+
+def test_retry_after_http_date_is_honoured(upstream):
+    upstream.reply(503, {"Retry-After": formatdate(time.time() + 2, usegmt=True)})
+    
+    assert post(upstream).status_code == 200
+    
+    # HTTP dates have one-second resolution.
+    gap = upstream.requests[1]["at"] - upstream.requests[0]["at"]
+    assert 0.9 <= gap < 2.5
+
+
+def test_retry_after_is_capped(monkeypatch):
+    monkeypatch.setattr(app, "HF_BACKOFF_MAX", 3)
+    response = requests.Response()
+    response.headers["Retry-After"] = "3600"
+    
+    assert app.retry_delay(0, response) == 3
+    assert app.parse_retry_after("not a date") is None
+
+
+def test_read_timeout_is_applied(upstream, monkeypatch):
+    monkeypatch.setattr(app, "HF_READ_TIMEOUT", 0.2)
+    upstream.reply(200, delay=1.0)
+    circuit = app.CircuitBreaker(5, 30)
+    
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        post(upstream, circuit)
+    
+    assert time.monotonic() - started < 0.8
+    assert upstream.count == 1
+    assert circuit.failures == 1
+
+
+def test_breaker_opens_after_threshold_then_half_open_probe_recovers(upstream, monkeypatch):
+    monkeypatch.setattr(app, "HF_MAX_RETRIES", 0)
+    circuit = app.CircuitBreaker(app.HF_BREAKER_THRESHOLD, 0.3)
+    upstream.always(503)
+    
+    for _ in range(app.HF_BREAKER_THRESHOLD):
+        assert post(upstream, circuit).status_code == 503
+    
+    with pytest.raises(app.CircuitOpenError):
+        post(upstream, circuit)
+    assert upstream.count == app.HF_BREAKER_THRESHOLD
+    
+    time.sleep(0.35)
+    upstream.always(200)
+    # The first call after the cool-down is the probe; others are refused until it returns.
+    assert circuit.allow()
+    assert not circuit.allow()
+    circuit.record_failure()
+    assert circuit.is_open()
+    
+    time.sleep(0.35)
+    assert post(upstream, circuit).status_code == 200
+    assert not circuit.is_open()
+    assert post(upstream, circuit).status_code == 200
+
+
+def test_connections_are_reused(upstream):
+    for _ in range(5):
+        post(upstream).close()
+    
+    clients = {request["client"] for request in upstream.requests}
+    assert upstream.count == 5
+    assert len(clients) == 1
@@ -0,0 +1,84 @@
+"""Bulk ingestion through /upload-zip."""
+import io
+import json
+import os
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import app
+from benchmarks.syllabus_pdf import generate_syllabus_pdf
+
+
+def make_zip(*pdfs):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for index, pdf in enumerate(pdfs):
+            archive.writestr(f"dept/syllabus-{index}.pdf", pdf)
+        archive.writestr("notes.txt", "not a syllabus")
+    return buffer.getvalue()
+
+
+def upload_zip(client, data, name="syllabi.zip"):
+    return client.post("/upload-zip", data={"file": (io.BytesIO(data), name)}, content_type="multipart/form-data")
+
+
+def test_zip_ingestion_streams_one_line_per_pdf(client):
+    response = upload_zip(client, make_zip(generate_syllabus_pdf(seed=101), generate_syllabus_pdf(seed=102)))
+    
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event["status"] for event in events] == ["ok", "ok", "done"]
+    assert events[-1]["succeeded"] == 2
+    for event in events[:-1]:
+        assert app.syllabus_store.get(event["syllabus_id"]) is not None
+
+
+def test_zip_ingestion_does_not_move_the_latest_upload(client, syllabus):
+    client.post(
+        "/upload-pdf?warmup=0",
+        data={"file": (io.BytesIO(generate_syllabus_pdf()), "syllabus.pdf")},
+        content_type="multipart/form-data"
+    )
+    assert app.syllabus_store.latest_id == syllabus["syllabus_id"]
+    
+    # Includes the already-known PDF, which is served from the store.
+    upload_zip(client, make_zip(generate_syllabus_pdf(), generate_syllabus_pdf(seed=103))).get_data()
+    
+    assert app.syllabus_store.latest_id == syllabus["syllabus_id"]
+    assert client.get("/get-syllabus-info").get_json()["syllabus_id"] == syllabus["syllabus_id"]
+
+
+def test_broken_extract_pool_is_replaced(client, monkeypatch):
+    monkeypatch.setattr(app, "PDF_EXTRACT_WORKERS", 2)
+    broken = app.get_extract_pool()
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+    
+    events = [json.loads(line) for line in upload_zip(client, make_zip(generate_syllabus_pdf(seed=105))).get_data(as_text=True).splitlines()]
+    
+    assert [event["status"] for event in events] == ["ok", "done"]
+    assert app.get_extract_pool() is not broken
+    assert app.get_extract_pool().submit(sum, [1, 2]).result() == 3
+
+
+def test_single_extract_worker_parses_in_process(client, monkeypatch):
+    monkeypatch.setattr(app, "PDF_EXTRACT_WORKERS", 1)
+    monkeypatch.setattr(app, "get_extract_pool", lambda: pytest.fail("started an extraction pool"))
+    
+    events = [json.loads(line) for line in upload_zip(client, make_zip(generate_syllabus_pdf(seed=106))).get_data(as_text=True).splitlines()]
+    
+    assert [event["status"] for event in events] == ["ok", "done"]
+
+
+def test_oversized_archive_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(app, "BULK_MAX_ARCHIVE_BYTES", 1000)
+    
+    response = upload_zip(client, make_zip(generate_syllabus_pdf(seed=104)))
+    
+    assert response.status_code == 413
+
+
+def test_non_zip_is_rejected(client):
+    assert upload_zip(client, b"plain text", "syllabi.zip").status_code == 400
+    assert upload_zip(client, b"PK", "syllabi.tar").status_code == 400
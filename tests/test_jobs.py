@@ -0,0 +1,111 @@
+"""The asynchronous job API: submission, polling, events, priorities and backpressure."""
+import threading
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def job_queue(monkeypatch):
+    queue = app.LocalJobQueue(workers=1, max_queued=2, retention=60)
+    monkeypatch.setattr(app, "job_queue", queue)
+    return queue
+
+
+def question_job(syllabus, prompt, **extra):
+    return dict({
+        "syllabus_id": syllabus["syllabus_id"],
+        "course_outcome": syllabus["available_cos"][0],
+        "prompt": prompt,
+        "cache": "bypass"
+    }, **extra)
+
+
+def wait_for(client, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").get_json()
+        if job["status"] in app.JOB_FINISHED:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_submit_returns_at_once_and_result_can_be_polled(client, upstream, route_to, syllabus, job_queue):
+    route_to(upstream)
+    upstream.always(delay=0.3)
+    
+    started = time.monotonic()
+    response = client.post("/jobs", json=question_job(syllabus, "Questions about graphs"))
+    
+    assert response.status_code == 202
+    assert time.monotonic() - started < 0.3
+    job = response.get_json()
+    assert response.headers["Location"] == f"/jobs/{job['job_id']}"
+    
+    job = wait_for(client, job["job_id"])
+    assert job["status"] == "done"
+    assert job["result"]["answer"].startswith("2-MARK QUESTIONS")
+    assert len(job["result"]["questions"]) == 2
+
+
+def test_failed_generation_marks_the_job_failed(client, upstream, route_to, syllabus, job_queue):
+    route_to(upstream)
+    upstream.always(400)
+    
+    job_id = client.post("/jobs", json=question_job(syllabus, "Questions that fail")).get_json()["job_id"]
+    
+    job = wait_for(client, job_id)
+    assert job["status"] == "failed"
+    assert job["error"].startswith("Error")
+
+
+def test_events_stream_until_the_job_finishes(client, upstream, route_to, syllabus, job_queue):
+    route_to(upstream)
+    upstream.always(delay=0.2)
+    job_id = client.post("/jobs", json=question_job(syllabus, "Questions about heaps")).get_json()["job_id"]
+    
+    body = client.get(f"/jobs/{job_id}/events").get_data(as_text=True)
+    
+    assert "event: done" in body
+
+
+def test_full_queue_returns_429_with_retry_hint(client, syllabus, job_queue):
+    release = threading.Event()
+    job_queue.submit("question", lambda: release.wait(5))
+    while job_queue.stats()["running"] == 0:
+        time.sleep(0.01)
+    for _ in range(job_queue.max_queued):
+        job_queue.submit("question", lambda: None)
+    
+    response = client.post("/jobs", json=question_job(syllabus, "One too many"))
+    release.set()
+    
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["retry_after"] >= 1
+
+
+def test_higher_priority_runs_first(job_queue):
+    release = threading.Event()
+    order = []
+    job_queue.submit("question", lambda: release.wait(5))
+    while job_queue.stats()["running"] == 0:
+        time.sleep(0.01)
+    low = job_queue.submit("question", lambda: order.append("low"), priority=0)
+    high = job_queue.submit("question", lambda: order.append("high"), priority=5)
+    
+    release.set()
+    for job in (low, high):
+        while job_queue.get(job["job_id"])["status"] not in app.JOB_FINISHED:
+            time.sleep(0.01)
+    
+    assert order == ["high", "low"]
+
+
+def test_invalid_submissions_are_rejected(client, syllabus, job_queue):
+    assert client.post("/jobs", json={"type": "essay"}).status_code == 400
+    assert client.post("/jobs", json=question_job(syllabus, "x", priority="high")).status_code == 400
+    assert client.get("/jobs/unknown").status_code == 404
@@ -0,0 +1,89 @@
+"""Parsing generated questions out of model answers."""
+import random
+
+import pytest
+
+import app
+
+ANSWER = """Here are your questions:
+
+PART A - (5 x 2 = 10 Marks)
+1. Define a stack and list its basic operations. [Remember]
+2. What is meant by
+   amortized analysis? (K2)
+3. **Explain** why a queue is FIFO. [Bloom's Level: Understand]
+
+PART B - (2 x 13 = 26 marks)
+Q4) Apply Dijkstra's algorithm to the given graph (see figure). [Apply]
+5. Analyse the complexity of merge sort (n log n) [Analyse]
+6. short [Apply]
+7. Compare arrays and linked lists without a tag
+"""
+
+
+def test_records_carry_per_question_marks_and_levels():
+    records = app.parse_generated_questions(ANSWER, "CO1")
+    
+    assert [(r["number"], r["marks"], r["bloom_level"]) for r in records] == [
+        (1, 2, "Remember"), (2, 2, "Understand"), (3, 2, "Understand"),
+        (4, 13, "Apply"), (5, 13, "Analyze"), (7, 13, None),
+    ]
+    assert records[1]["text"] == "What is meant by amortized analysis?"
+    assert records[3]["text"] == "Apply Dijkstra's algorithm to the given graph (see figure)."
+    assert {r["course_outcome"] for r in records} == {"CO1"}
+
+
+@pytest.mark.parametrize("heading, marks", [
+    ("PART A - (5 x 2 = 10 Marks)", 2),
+    ("PART B - (2 x 13 = 26 marks)", 13),
+    ("Part C (1 × 15 = 15 Marks)", 15),
+    ("Part A (2 marks each)", 2),
+    ("Part B: 13-marks each", 13),
+    ("2-MARK QUESTIONS:", 2),
+    ("**10 Marks**", 10),
+    ("Questions for this unit", None),
+])
+def test_heading_marks(heading, marks):
+    assert app.heading_marks(heading) == marks
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_chunked_feed_matches_one_shot_parse(seed):
+    rng = random.Random(seed)
+    parser = app.QuestionStreamParser("CO1")
+    emitted = []
+    start = 0
+    while start < len(ANSWER):
+        end = start + rng.randint(1, 12)
+        emitted += parser.feed(ANSWER[start:end])
+        start = end
+    emitted += parser.close()
+    
+    assert emitted == parser.questions == app.parse_generated_questions(ANSWER, "CO1")
+
+
+def test_tagged_question_is_emitted_when_its_line_ends():
+    parser = app.QuestionStreamParser()
+    
+    assert parser.feed("2 marks:\n1. Define a stack and its operations. [Remember]") == []
+    assert [r["number"] for r in parser.feed("\n")] == [1]
+    assert parser.feed("2. Explain queues in some detail\n") == []
+    assert [r["number"] for r in parser.close()] == [2]
+
+
+def test_bloom_distribution_against_the_request():
+    records = app.parse_generated_questions(ANSWER)
+    
+    check = app.check_bloom_distribution(records, *app.requested_bloom_levels("2 Apply questions and one Create question"))
+    assert not check["ok"]
+    assert check["untagged"] == 1
+    assert check["requested"] == {"Apply": 2, "Create": 1}
+    
+    tagged = [r for r in records if r["bloom_level"]]
+    assert app.check_bloom_distribution(tagged, *app.requested_bloom_levels("Analyze: 1, one apply question"))["ok"]
+    assert not app.check_bloom_distribution([dict(r, bloom_level="Apply") for r in tagged])["ok"]
+
+
+def test_plain_verbs_are_not_bloom_requests():
+    assert app.requested_bloom_levels("Questions that apply to trees") == ({}, set())
+    assert app.requested_bloom_levels("Some Evaluate-level questions") == ({}, {"Evaluate"})
@@ -0,0 +1,49 @@
+"""Cached syllabus read payloads: ETags, conditional requests and compression."""
+import gzip
+import json
+
+import pytest
+
+import app
+
+READS = ["/get-syllabus-info", "/get-syllabus-details", "/get-co-topics/CO1"]
+
+
+@pytest.mark.parametrize("path", READS)
+def test_conditional_get_returns_304(client, syllabus, path):
+    url = f"{path}?syllabus_id={syllabus['syllabus_id']}"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    
+    assert first.status_code == 200
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    # If-None-Match uses the weak comparison.
+    assert client.get(url, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"something-else"'}).status_code == 200
+
+
+def test_each_content_coding_has_its_own_etag(client, syllabus, monkeypatch):
+    monkeypatch.setattr(app, "RESPONSE_COMPRESS_MIN_BYTES", 0)
+    url = f"/get-syllabus-details?syllabus_id={syllabus['syllabus_id']}"
+    
+    plain = client.get(url)
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    
+    # A validator for one coding does not revalidate the other.
+    assert client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]}).status_code == 200
+    assert client.get(url, headers={
+        "Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]
+    }).status_code == 304
+
+
+def test_payload_matches_jsonify(client, syllabus):
+    response = client.get(f"/get-co-topics/CO1?syllabus_id={syllabus['syllabus_id']}")
+    
+    with app.app.app_context():
+        expected = app.jsonify(response.get_json()).get_data()
+    assert response.get_data() == expected
@@ -0,0 +1,37 @@
+"""The compact Syllabus model built from parsed syllabus data."""
+import marshal
+
+import pytest
+
+import app
+from benchmarks.syllabus_pdf import build_syllabus_lines
+
+
+@pytest.fixture
+def model():
+    return app.Syllabus.from_data(app.parse_syllabus("\n".join(build_syllabus_lines(units=4, seed=7))))
+
+
+def test_each_co_maps_to_its_unit(model):
+    assert model.available_cos == ["CO1", "CO2", "CO3", "CO4"]
+    for number, co_code in enumerate(model.available_cos):
+        unit = model.unit_for(co_code)
+        assert unit is model.units[number]
+        assert unit.context == app.render_topics(unit.topics)
+    assert model.unit_for("CO9") is None
+    assert model.select_context("CO9", "anything") is None
+
+
+def test_binary_round_trip(model):
+    restored = app.Syllabus.from_bytes(model.to_bytes())
+    
+    assert restored == model
+    assert restored.available_cos == model.available_cos
+    assert restored.select_context("CO2", "trees") == model.select_context("CO2", "trees")
+
+
+def test_other_formats_are_refused(model):
+    blob = marshal.dumps((app.SYLLABUS_MODEL_FORMAT - 1, model.to_tuple()))
+    
+    with pytest.raises(ValueError):
+        app.Syllabus.from_bytes(blob)
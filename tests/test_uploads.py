@@ -0,0 +1,90 @@
+"""Upload size limits and spooling for /upload-pdf."""
+import hashlib
+import io
+import tempfile
+import threading
+
+import pytest
+import requests
+from werkzeug.serving import make_server
+
+import app
+from benchmarks.syllabus_pdf import generate_syllabus_pdf
+
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    monkeypatch.setitem(app.app.config, "MAX_CONTENT_LENGTH", 200_000)
+
+
+@pytest.fixture
+def live_server():
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def multipart_chunks(size):
+    boundary = "upload-boundary"
+    yield (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.pdf\"\r\n"
+           "Content-Type: application/pdf\r\n\r\n%PDF-1.4\n").encode()
+    for _ in range(size // 65536):
+        yield b"0" * 65536
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def test_oversized_upload_with_length_is_rejected(client, small_limit):
+    response = client.post(
+        "/upload-pdf",
+        data={"file": (io.BytesIO(b"%PDF-" + b"0" * 300_000), "big.pdf")},
+        content_type="multipart/form-data"
+    )
+    
+    assert response.status_code == 413
+    assert "error" in response.get_json()
+
+
+def test_oversized_chunked_upload_is_rejected_while_parsing(live_server, small_limit):
+    response = requests.post(
+        f"{live_server}/upload-pdf",
+        data=multipart_chunks(2_000_000),
+        headers={"Content-Type": "multipart/form-data; boundary=upload-boundary"}
+    )
+    
+    assert response.status_code == 413
+    assert "error" in response.json()
+
+
+def test_large_upload_is_parsed(client, monkeypatch):
+    monkeypatch.setattr(app, "UPLOAD_SPOOL_BYTES", 1024)
+    
+    response = client.post(
+        "/upload-pdf?warmup=0",
+        data={"file": (io.BytesIO(generate_syllabus_pdf(seed=201, pages=40)), "syllabus.pdf")},
+        content_type="multipart/form-data"
+    )
+    
+    assert response.status_code == 200
+    assert response.get_json()["available_cos"]
+
+
+def test_spooled_file_is_mapped_in_place():
+    data = generate_syllabus_pdf(seed=202)
+    with tempfile.NamedTemporaryFile() as spooled:
+        spooled.write(data)
+        
+        with app.SpooledUpload(spooled, len(data)) as upload:
+            assert upload.path == spooled.name
+            assert upload.digest == hashlib.sha256(data).hexdigest()
+            assert upload.open()[:] == data
+
+
+def test_in_memory_stream_is_copied_with_a_cap():
+    data = b"%PDF-" + b"1" * 5000
+    
+    with app.SpooledUpload(io.BytesIO(data), len(data)) as upload:
+        assert upload.path is None
+        assert upload.open().read() == data
+    with pytest.raises(app.UploadRejected):
+        app.SpooledUpload(io.BytesIO(data), len(data) - 1)